@@ -0,0 +1,99 @@
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from PIL import Image
+
+from detection_core import DetectionPipeline, KNOWN_OBJECTS, estimate_object_distance
+from stubs import StubModelClient
+
+# ============================================
+# DETECTION CORE BENCHMARK
+# ============================================
+# Post-model cost of the shared pipeline (the part every entry point runs):
+# box conversion + distance estimates, versus the per-box dict loop it
+# replaced, plus an end-to-end run() against the zero-latency stub model.
+# Usage: python debug/bench_detection_core.py [frames]
+
+LABELS = list(KNOWN_OBJECTS) + ["office chair", "water bottle", "door", "potted plant", "stairs"]
+
+
+def make_frames(n, boxes_per_frame, seed=0):
+    rng = random.Random(seed)
+    frames = []
+    for _ in range(n):
+        boxes = []
+        for _ in range(boxes_per_frame):
+            y, x = rng.randint(0, 700), rng.randint(0, 700)
+            boxes.append({"box_2d": [y, x, y + rng.randint(20, 300), x + rng.randint(20, 300)],
+                          "label": rng.choice(LABELS)})
+        frames.append(boxes)
+    return frames
+
+
+def legacy_convert(bounding_boxes, image_height):
+    """The dict-per-box loop app.py used before detection_core"""
+    detections = []
+    for bbox in bounding_boxes:
+        norm_y1 = bbox["box_2d"][0] / 1000.0
+        norm_x1 = bbox["box_2d"][1] / 1000.0
+        norm_y2 = bbox["box_2d"][2] / 1000.0
+        norm_x2 = bbox["box_2d"][3] / 1000.0
+        norm_box = {'x': norm_x1, 'y': norm_y1, 'width': norm_x2 - norm_x1, 'height': norm_y2 - norm_y1}
+        label = bbox.get('label', 'object')
+        detections.append({
+            'x': norm_x1,
+            'y': norm_y1,
+            'width': norm_box['width'],
+            'height': norm_box['height'],
+            'label': label,
+            'confidence': bbox.get('confidence', 0.9),
+            'distance_m': estimate_object_distance(norm_box, label, image_height),
+        })
+    return detections
+
+
+def bench(name, func, frames, image_height=1080):
+    func(frames[0], image_height)  # warm memo tables
+
+    start = time.perf_counter()
+    for boxes in frames:
+        func(boxes, image_height)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    kept = [func(boxes, image_height) for boxes in frames[:200]]
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+
+    print(f"  {name:<22} {elapsed / len(frames) * 1e6:8.1f} us/frame   "
+          f"{peak / min(200, len(frames)):8.0f} B/frame retained")
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    pipeline = DetectionPipeline(StubModelClient(latency=0, jitter=0))
+
+    for boxes_per_frame in (5, 20, 100):
+        frames = make_frames(n, boxes_per_frame)
+        print(f"{boxes_per_frame} boxes/frame, {n} frames")
+        bench("legacy dict loop", legacy_convert, frames)
+        bench("pipeline.convert", pipeline.convert, frames)
+        bench("convert + to_dict", lambda b, h: [d.to_dict() for d in pipeline.convert(b, h)], frames)
+
+    image = Image.new("RGB", (768, 576), (90, 120, 150))
+    runs = max(1, n // 10)
+    start = time.perf_counter()
+    for _ in range(runs):
+        pipeline.run(image)
+    elapsed = time.perf_counter() - start
+    print(f"end-to-end run() with stub model: {elapsed / runs * 1e6:.1f} us/frame over {runs} frames")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from transport import build_http_client
+
+# ============================================
+# CONNECTION REUSE BENCHMARK (LOCAL STUB)
+# ============================================
+# Simulates one frame = one detection POST + one streamed TTS GET against a
+# local stub server and counts how many TCP connections each setup opens.
+# Usage: python debug/bench_transport.py [frames] [threads]
+
+DETECTION_BODY = b'[{"box_2d": [100, 100, 500, 500], "label": "chair"}]'
+AUDIO_CHUNK = b"\x00" * 4096
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(DETECTION_BODY)))
+        self.end_headers()
+        self.wfile.write(DETECTION_BODY)
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "audio/mpeg")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for _ in range(8):
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(AUDIO_CHUNK), AUDIO_CHUNK))
+        self.wfile.write(b"0\r\n\r\n")
+
+    def log_message(self, *args):
+        pass
+
+
+class CountingServer(ThreadingHTTPServer):
+    daemon_threads = True
+    connections = 0
+
+    def get_request(self):
+        request = super().get_request()
+        self.connections += 1
+        return request
+
+
+def run_frame(http, base_url):
+    http.post(f"{base_url}/detect", content=b"x" * 20000).raise_for_status()
+    with http.stream("GET", f"{base_url}/tts") as response:
+        audio = bytearray()
+        for chunk in response.iter_bytes():
+            audio += chunk
+
+
+def bench(name, make_client, shared, server, base_url, frames, threads):
+    server.connections = 0
+    latencies = []
+    lock = threading.Lock()
+    client = make_client() if shared else None
+
+    def worker(count):
+        for _ in range(count):
+            start = time.perf_counter()
+            http = client or make_client()
+            run_frame(http, base_url)
+            elapsed = time.perf_counter() - start
+            if not shared:
+                http.close()
+            with lock:
+                latencies.append(elapsed)
+
+    start = time.perf_counter()
+    workers = [threading.Thread(target=worker, args=(frames // threads,)) for _ in range(threads)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    total = time.perf_counter() - start
+
+    latencies.sort()
+    print(f"{name:>14}: {len(latencies)} frames, {server.connections} connections "
+          f"({server.connections / len(latencies):.2f}/frame), "
+          f"p50 {latencies[len(latencies) // 2] * 1000:.2f}ms, total {total:.2f}s")
+
+
+if __name__ == "__main__":
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+
+    server = CountingServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    bench("client/request", httpx.Client, False, server, base_url, frames, threads)
+    bench("shared pool", build_http_client, True, server, base_url, frames, threads)
+    server.shutdown()
@@ -0,0 +1,89 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from governor import ProviderGovernor
+from model_client import ResilientModelClient
+
+# ============================================
+# GOVERNOR CHARGING CHECK (OFFLINE)
+# ============================================
+# Every billed Gemini request must pass the governor: the first attempt is
+# charged by the caller, and each failover or hedge through admit_backup.
+# Runs ResilientModelClient against a fake genai client and checks the counts.
+# Usage: python debug/check_governor_charging.py
+
+
+class FakeModels:
+    """client.models stand-in: per-model failure and latency"""
+
+    def __init__(self, failing=(), slow=()):
+        self.failing = set(failing)
+        self.slow = set(slow)
+        self.requests = []
+
+    def generate_content(self, model, contents, config=None):
+        self.requests.append(model)
+        if model in self.slow:
+            time.sleep(0.3)
+        if model in self.failing:
+            raise RuntimeError(f"{model} is down")
+        return model
+
+
+class FakeClient:
+    def __init__(self, models):
+        self.models = models
+
+
+def make_client(models, governor, **kwargs):
+    return ResilientModelClient(
+        FakeClient(models), ["primary", "secondary", "tertiary"],
+        admit_backup=lambda contents: governor.acquire("backup"), **kwargs
+    )
+
+
+def check_failover_is_charged():
+    governor = ProviderGovernor("check")
+    models = FakeModels(failing={"primary"})
+    client = make_client(models, governor, hedge=False)
+    assert client.generate_content(["frame"]) == "secondary"
+    assert models.requests == ["primary", "secondary"], models.requests
+    # The primary attempt is the caller's; the failover is the one extra request
+    assert governor.admitted == 1, governor.stats()
+
+
+def check_failover_denied_over_budget():
+    governor = ProviderGovernor("check", rpm=1, burst_seconds=0)
+    governor.acquire("backup")  # spend the only request
+    models = FakeModels(failing={"primary"})
+    client = make_client(models, governor, hedge=False)
+    try:
+        client.generate_content(["frame"])
+    except RuntimeError:
+        pass
+    else:
+        raise AssertionError("failover ran without a governor token")
+    assert models.requests == ["primary"], models.requests
+    assert client.failovers_denied == 1
+
+
+def check_hedge_is_charged():
+    governor = ProviderGovernor("check")
+    models = FakeModels(slow={"primary"})
+    client = make_client(models, governor, hedge_default_delay=0.05)
+    client.generate_content(["frame"])
+    assert client.hedges_sent == 1
+    assert governor.admitted == 1, governor.stats()
+
+
+def main():
+    for check in (check_failover_is_charged, check_failover_denied_over_budget, check_hedge_is_charged):
+        check()
+        print(f"ok  {check.__name__}")
+
+
+if __name__ == "__main__":
+    main()
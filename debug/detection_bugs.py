@@ -1,12 +1,14 @@
 from google import genai
-from google.genai import types
 from PIL import Image
-import json
 import cv2
-import numpy as np
 import os
+import sys
 from dotenv import load_dotenv
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from scene_scheduler import SceneChangeScheduler
+from detection_core import DetectionPipeline, SingleModelClient, json_config, probe_models
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -16,50 +18,31 @@ if not api_key:
     raise ValueError("Please set GOOGLE_API_KEY in your .env file")
 
 client = genai.Client(api_key=api_key)
-prompt = "Detect all of the prominent items in the image. The box_2d should be [ymin, xmin, ymax, xmax] normalized to 0-1000."
 
 # Try to find a working model
-MODELS_TO_TRY = ["gemini-1.5-flash", "gemini-1.5-pro", "gemini-2.0-flash-exp"]
-ACTIVE_MODEL = None
-
 print("Testing available models...")
-for model in MODELS_TO_TRY:
-    try:
-        test_response = client.models.generate_content(
-            model=model,
-            contents="test"
-        )
-        ACTIVE_MODEL = model
-        print(f"✅ Using model: {ACTIVE_MODEL}")
-        break
-    except Exception as e:
-        print(f"❌ {model} not available")
+ACTIVE_MODEL = probe_models(client)
 
 if not ACTIVE_MODEL:
     raise ValueError("No working Gemini model found. Check your API key.")
+print(f"✅ Using model: {ACTIVE_MODEL}")
 
 # ============================================
 # DISTANCE ESTIMATION CONFIGURATION
 # ============================================
 
-# Known object dimensions (real-world measurements in cm)
-# Add more objects as needed
-KNOWN_OBJECTS = {
-    "person": {"width_cm": 50, "height_cm": 170},
-    "laptop": {"width_cm": 35, "height_cm": 25},
-    "phone": {"width_cm": 7, "height_cm": 15},
-    "bottle": {"width_cm": 7, "height_cm": 20},
-    "cup": {"width_cm": 8, "height_cm": 10},
-    "book": {"width_cm": 15, "height_cm": 20},
-    "chair": {"width_cm": 45, "height_cm": 90},
-    "monitor": {"width_cm": 50, "height_cm": 30},
-    # Add more objects and their dimensions here
-}
+# Known object sizes live in detection_core.KNOWN_OBJECTS
 
 # Focal length - CALIBRATE THIS FOR YOUR CAMERA!
 # Run calibrate_focal_length.py to get the correct value
 FOCAL_LENGTH = 700  # Default value, needs calibration
 
+pipeline = DetectionPipeline(
+    SingleModelClient(client, ACTIVE_MODEL),
+    config=json_config(),
+    focal_length=FOCAL_LENGTH
+)
+
 
 # ============================================
 # DISTANCE ESTIMATION FUNCTIONS
@@ -88,54 +71,6 @@ def find_marker(image):
     return cv2.minAreaRect(c)
 
 
-def distance_to_camera(knownWidth, focalLength, perWidth):
-    """
-    Calculate distance between object and camera
-    
-    Args:
-        knownWidth: Real-world width of object (cm)
-        focalLength: Camera focal length (calibrated)
-        perWidth: Perceived width in pixels
-    
-    Returns:
-        Distance in cm, or None if invalid
-    """
-    if perWidth == 0:
-        return None
-    return (knownWidth * focalLength) / perWidth
-
-
-def estimate_object_distance(box, label):
-    """
-    Estimate distance to a detected object using its bounding box
-    
-    Args:
-        box: Dictionary with x1, y1, x2, y2 coordinates
-        label: Object label (e.g., "person", "laptop")
-    
-    Returns:
-        Distance in centimeters, or None if can't estimate
-    """
-    # Get object info
-    object_info = KNOWN_OBJECTS.get(label.lower())
-    
-    if not object_info:
-        # Unknown object, can't estimate distance
-        return None
-    
-    # Calculate bounding box dimensions
-    box_width = box['x2'] - box['x1']
-    box_height = box['y2'] - box['y1']
-    
-    # Use height for distance estimation (usually more reliable)
-    known_height = object_info['height_cm']
-    
-    # Calculate distance
-    distance = distance_to_camera(known_height, FOCAL_LENGTH, box_height)
-    
-    return distance
-
-
 # ============================================
 # MAIN DETECTION LOOP
 # ============================================
@@ -150,11 +85,6 @@ if not capture.isOpened():
 capture.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
 capture.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
 
-# API configuration
-config = types.GenerateContentConfig(
-    response_mime_type="application/json"
-)
-
 print("\nStarting video detection with distance estimation...")
 print("Press 'q' to quit")
 print("Press 's' to process current frame")
@@ -163,7 +93,8 @@ print("Press 'c' to clear detections")
 
 frame_count = 0
 auto_detect = False
-process_every_n_frames = 60  # Process every 60 frames (every 2 seconds at 30fps)
+# Detect when the scene changes, at most every 0.5s and at least every 5s
+scheduler = SceneChangeScheduler(change_threshold=12.0, min_interval=0.5, max_staleness=5.0)
 last_detections = []
 
 try:
@@ -179,7 +110,7 @@ try:
         
         # Auto-detection mode
         should_process = False
-        if auto_detect and frame_count % process_every_n_frames == 0:
+        if auto_detect and scheduler.should_detect(frame):
             should_process = True
         
         # Handle key presses
@@ -187,7 +118,7 @@ try:
         if key == ord('q'):
             break
         elif key == ord('s'):
-            should_process = True
+            should_process = scheduler.should_detect(frame, force=True)
             print("Manual detection triggered...")
         elif key == ord('a'):
             auto_detect = not auto_detect
@@ -203,63 +134,25 @@ try:
                 rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
                 pil_image = Image.fromarray(rgb_frame)
                 
-                # Get image dimensions
-                width, height = pil_image.size
-                
-                # Call Gemini API for object detection
+                # Call Gemini API, parse boxes and estimate distances
                 print(f"Processing frame {frame_count}...")
-                response = client.models.generate_content(
-                    model=ACTIVE_MODEL,
-                    contents=[pil_image, prompt],
-                    config=config
-                )
-                
-                # Parse bounding boxes
-                bounding_boxes = json.loads(response.text)
-                
-                # Convert normalized coordinates to absolute and estimate distance
-                last_detections = []
-                for bbox in bounding_boxes:
-                    abs_y1 = int(bbox["box_2d"][0]/1000 * height)
-                    abs_x1 = int(bbox["box_2d"][1]/1000 * width)
-                    abs_y2 = int(bbox["box_2d"][2]/1000 * height)
-                    abs_x2 = int(bbox["box_2d"][3]/1000 * width)
-                    
-                    label = bbox.get("label", "object")
-                    box = {
-                        "x1": abs_x1,
-                        "y1": abs_y1,
-                        "x2": abs_x2,
-                        "y2": abs_y2
-                    }
-                    
-                    # Estimate distance
-                    distance_cm = estimate_object_distance(box, label)
-                    
-                    detection = {
-                        "coords": [abs_x1, abs_y1, abs_x2, abs_y2],
-                        "label": label,
-                        "distance_cm": distance_cm,
-                        "distance_m": round(distance_cm / 100, 2) if distance_cm else None
-                    }
-                    
-                    last_detections.append(detection)
+                last_detections = pipeline.run(pil_image)
                 
                 print(f"Detected {len(last_detections)} objects:")
                 for det in last_detections:
-                    if det['distance_m']:
-                        print(f"  - {det['label']}: {det['distance_m']}m")
+                    if det.distance_m:
+                        print(f"  - {det.label}: {det.distance_m}m")
                     else:
-                        print(f"  - {det['label']}: (distance unknown)")
+                        print(f"  - {det.label}: (distance unknown)")
                 
             except Exception as e:
                 print(f"Error processing frame: {e}")
         
         # Draw bounding boxes and distance on display frame
         for det in last_detections:
-            x1, y1, x2, y2 = det["coords"]
-            label = det["label"]
-            distance = det["distance_m"]
+            x1, y1, x2, y2 = det.pixel_box(display_frame.shape[1], display_frame.shape[0])
+            label = det.label
+            distance = det.distance_m
             
             # Choose color based on whether distance is known
             color = (0, 255, 0) if distance else (255, 165, 0)  # Green if distance known, orange otherwise
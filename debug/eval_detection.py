@@ -0,0 +1,299 @@
+import argparse
+import json
+import math
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.insert(0, SRC_DIR)
+
+# ============================================
+# DETECTION QUALITY / LATENCY / COST EVALUATION
+# ============================================
+# Runs app.run_detection over a labeled dataset once per configuration and
+# prints mAP@0.5, distance error, latency and cost per frame, marking the
+# Pareto-optimal configurations.
+#
+# Dataset: a directory of frames plus annotations.jsonl, one line per frame:
+#   {"image": "frame_001.jpg",
+#    "objects": [{"label": "chair", "box_2d": [ymin, xmin, ymax, xmax], "distance_m": 2.1}]}
+# box_2d is normalized to 0-1000 like the model output; distance_m is optional.
+#
+# Configurations: a JSON list of {"name": ..., "env": {...}}; each runs in its
+# own process with those environment variables (DECODE_MAX_DIM, GEMINI_MODELS,
+# BATCH_MAX_SIZE, ...). Without --configs a DECODE_MAX_DIM sweep is used.
+#
+# Usage: python debug/eval_detection.py DATASET_DIR [--configs configs.json] [--stub]
+
+DEFAULT_CONFIGS = [{"name": f"max_dim={d}", "env": {"DECODE_MAX_DIM": str(d)}} for d in (384, 512, 768, 1024)]
+
+# USD per 1M tokens (gemini-2.0-flash list prices); override with --input-price/--output-price
+INPUT_PRICE = 0.10
+OUTPUT_PRICE = 0.40
+
+
+# ---------------- Metrics ----------------
+
+def to_box(box_2d):
+    ymin, xmin, ymax, xmax = (v / 1000.0 for v in box_2d)
+    return {'x': xmin, 'y': ymin, 'width': xmax - xmin, 'height': ymax - ymin}
+
+
+def canonical_label(label, classes):
+    """Map free-form model labels onto the dataset vocabulary ("office chair" -> "chair")"""
+    label = label.lower().strip()
+    if label in classes:
+        return label
+    for name in sorted(classes, key=len, reverse=True):
+        if name in label:
+            return name
+    return label
+
+
+def average_precision(scored_hits, num_gt):
+    """VOC all-point interpolated AP from (score, is_true_positive) pairs"""
+    if num_gt == 0:
+        return None
+    scored_hits.sort(key=lambda h: -h[0])
+    tp = fp = 0
+    points = []
+    for _, hit in scored_hits:
+        tp += hit
+        fp += not hit
+        points.append((tp / num_gt, tp / (tp + fp)))
+
+    ap = 0.0
+    previous_recall = 0.0
+    for i, (recall, _) in enumerate(points):
+        best_precision = max(p for _, p in points[i:])
+        ap += (recall - previous_recall) * best_precision
+        previous_recall = recall
+    return ap
+
+
+def evaluate(frames, iou_threshold=0.5):
+    """
+    Args:
+        frames: List of (ground truth objects, predicted detections) per frame
+
+    Returns:
+        Dict of mAP, per-class AP and distance error statistics
+    """
+    from ranking import box_iou
+
+    classes = {obj['label'].lower().strip() for gt, _ in frames for obj in gt}
+    hits = {c: [] for c in classes}
+    gt_counts = {c: 0 for c in classes}
+    abs_errors, rel_errors = [], []
+    gt_with_distance = 0
+
+    for gt, predictions in frames:
+        gt_boxes = [(obj['label'].lower().strip(), to_box(obj['box_2d']), obj.get('distance_m')) for obj in gt]
+        for label, _, distance in gt_boxes:
+            gt_counts[label] += 1
+            gt_with_distance += distance is not None
+
+        used = set()
+        for det in sorted(predictions, key=lambda d: -(d.get('confidence') or 0)):
+            label = canonical_label(det['label'], classes)
+            best, best_iou = None, iou_threshold
+            for j, (gt_label, gt_box, _) in enumerate(gt_boxes):
+                if j in used or gt_label != label:
+                    continue
+                overlap = box_iou(det, gt_box)
+                if overlap >= best_iou:
+                    best, best_iou = j, overlap
+            # Labels outside the dataset vocabulary have no AP to count against
+            if label in hits:
+                hits[label].append((det.get('confidence') or 0, best is not None))
+            if best is None:
+                continue
+            used.add(best)
+            true_distance = gt_boxes[best][2]
+            if true_distance is not None and det.get('distance_m') is not None:
+                abs_errors.append(abs(det['distance_m'] - true_distance))
+                rel_errors.append(abs(det['distance_m'] - true_distance) / true_distance)
+
+    per_class = {c: average_precision(hits[c], gt_counts[c]) for c in classes}
+    scored = [ap for ap in per_class.values() if ap is not None]
+    return {
+        'map50': sum(scored) / len(scored) if scored else 0.0,
+        'per_class_ap': per_class,
+        'distance_mae_m': statistics.mean(abs_errors) if abs_errors else None,
+        'distance_median_rel': statistics.median(rel_errors) if rel_errors else None,
+        'distance_coverage': len(abs_errors) / gt_with_distance if gt_with_distance else None,
+    }
+
+
+# ---------------- Worker (one configuration) ----------------
+
+class UsageRecorder:
+    """Wraps the app's model client to total token usage per call"""
+
+    def __init__(self, model_client):
+        self.model_client = model_client
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.estimated = False
+
+    def __getattr__(self, name):
+        return getattr(self.model_client, name)
+
+    @staticmethod
+    def image_tokens(image):
+        # Gemini bills 258 tokens per image up to 384px, else per 768px tile
+        width, height = image.size
+        if width <= 384 and height <= 384:
+            return 258
+        return 258 * math.ceil(width / 768) * math.ceil(height / 768)
+
+    def generate_content(self, contents, config=None):
+        response = self.model_client.generate_content(contents=contents, config=config)
+        usage = getattr(response, 'usage_metadata', None)
+        if usage is not None and usage.prompt_token_count:
+            self.input_tokens += usage.prompt_token_count
+            self.output_tokens += usage.candidates_token_count or 0
+        else:
+            self.estimated = True
+            for part in contents:
+                self.input_tokens += self.image_tokens(part) if hasattr(part, 'size') else len(str(part)) // 4
+            self.output_tokens += len(response.text or "") // 4
+        return response
+
+
+def run_worker(dataset_dir, limit):
+    import app
+
+    recorder = UsageRecorder(app.model_client)
+    app.model_client = recorder
+    app.pipeline.model_client = recorder
+
+    with open(os.path.join(dataset_dir, "annotations.jsonl")) as f:
+        annotations = [json.loads(line) for line in f if line.strip()]
+    if limit:
+        annotations = annotations[:limit]
+
+    frames, latencies, errors = [], [], 0
+    for entry in annotations:
+        with open(os.path.join(dataset_dir, entry['image']), "rb") as f:
+            image_bytes = f.read()
+        start = time.perf_counter()
+        try:
+            detections, _ = app.run_detection(image_bytes)
+        except Exception as e:
+            print(f"{entry['image']}: {e}", file=sys.stderr)
+            detections = []
+            errors += 1
+        latencies.append(time.perf_counter() - start)
+        frames.append((entry.get('objects', []), detections))
+
+    result = evaluate(frames)
+    result.update(
+        frames=len(frames),
+        errors=errors,
+        p50_ms=statistics.median(latencies) * 1000 if latencies else None,
+        p95_ms=sorted(latencies)[int(0.95 * (len(latencies) - 1))] * 1000 if latencies else None,
+        input_tokens=recorder.input_tokens / max(1, len(frames)),
+        output_tokens=recorder.output_tokens / max(1, len(frames)),
+        tokens_estimated=recorder.estimated,
+        model=app.model_client.active_model,
+    )
+    print(json.dumps(result))
+
+
+# ---------------- Driver ----------------
+
+def run_config(config, args):
+    env = dict(os.environ)
+    # Evaluation never speaks; keep TTS offline so only detector keys are needed
+    env.update({"TTS_BACKEND": "stub", "TTS_LOCAL": "0", "LOG_LEVEL": "WARNING"})
+    if args.stub:
+        env["DETECTOR_BACKEND"] = "stub"
+    env.update(config.get("env", {}))
+
+    command = [sys.executable, os.path.abspath(__file__), args.dataset, "--worker"]
+    if args.limit:
+        command += ["--limit", str(args.limit)]
+    completed = subprocess.run(command, env=env, cwd=SRC_DIR, capture_output=True, text=True)
+    if completed.returncode != 0:
+        print(f"[{config['name']}] failed:\n{completed.stderr[-2000:]}", file=sys.stderr)
+        return None
+
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result['cost_per_1k'] = (result['input_tokens'] * args.input_price
+                             + result['output_tokens'] * args.output_price) / 1000.0
+    return result
+
+
+def pareto_front(rows):
+    """Names of configurations not dominated on (higher mAP, lower p50, lower cost)"""
+    def dominates(a, b):
+        better_or_equal = (a['map50'] >= b['map50'] and a['p50_ms'] <= b['p50_ms']
+                           and a['cost_per_1k'] <= b['cost_per_1k'])
+        strictly = (a['map50'] > b['map50'] or a['p50_ms'] < b['p50_ms']
+                    or a['cost_per_1k'] < b['cost_per_1k'])
+        return better_or_equal and strictly
+
+    return {name for name, row in rows if not any(dominates(other, row) for _, other in rows)}
+
+
+def print_table(rows):
+    front = pareto_front(rows)
+    fmt = lambda v, spec: format(v, spec) if v is not None else "-"
+    header = (f"{'config':<22} {'mAP@.5':>7} {'dMAE m':>7} {'dRel':>6} {'dCov':>5} "
+              f"{'p50 ms':>8} {'p95 ms':>8} {'tok/fr':>7} {'$/1k fr':>8} {'err':>4}  pareto")
+    print(header)
+    print("-" * len(header))
+    for name, r in sorted(rows, key=lambda item: item[1]['p50_ms']):
+        tokens = r['input_tokens'] + r['output_tokens']
+        print(f"{name:<22} {r['map50']:>7.3f} {fmt(r['distance_mae_m'], '7.2f'):>7} "
+              f"{fmt(r['distance_median_rel'], '6.2f'):>6} {fmt(r['distance_coverage'], '5.2f'):>5} "
+              f"{r['p50_ms']:>8.0f} {r['p95_ms']:>8.0f} {tokens:>6.0f}{'~' if r['tokens_estimated'] else ' '} "
+              f"{r['cost_per_1k']:>8.4f} {r['errors']:>4}  {'*' if name in front else ''}")
+    print("\n* Pareto-optimal (no other config is at least as accurate, fast and cheap)"
+          "\n~ token counts estimated (backend reported no usage)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate detection accuracy, latency and cost per configuration")
+    parser.add_argument("dataset", help="Directory with frames and annotations.jsonl")
+    parser.add_argument("--configs", help="JSON file with a list of {name, env} configurations")
+    parser.add_argument("--limit", type=int, help="Only evaluate the first N frames")
+    parser.add_argument("--stub", action="store_true", help="Use DETECTOR_BACKEND=stub (harness dry run)")
+    parser.add_argument("--input-price", type=float, default=INPUT_PRICE, help="USD per 1M input tokens")
+    parser.add_argument("--output-price", type=float, default=OUTPUT_PRICE, help="USD per 1M output tokens")
+    parser.add_argument("--json-out", help="Write all results to this JSON file")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.dataset, args.limit)
+        return
+
+    args.dataset = os.path.abspath(args.dataset)
+    configs = DEFAULT_CONFIGS
+    if args.configs:
+        with open(args.configs) as f:
+            configs = json.load(f)
+
+    rows = []
+    for config in configs:
+        print(f"Evaluating {config['name']}...", file=sys.stderr)
+        result = run_config(config, args)
+        if result is not None:
+            rows.append((config['name'], result))
+
+    if not rows:
+        raise SystemExit("No configuration completed")
+    print_table(rows)
+
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            json.dump({name: result for name, result in rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from detection_core.response_parser import parse_json, parse_json_list, ResponseParseError
+
+# ============================================
+# FUZZ + PERFORMANCE CHECKS FOR detection_core.response_parser
+# ============================================
+# Usage: python debug/fuzz_response_parser.py [iterations]
+
+LABELS = ["person", "chair", "cup", "laptop", "bottle", "door", "stairs"]
+
+PREFIXES = [
+    "",
+    "Here are the detected objects:\n",
+    "Sure! See [1] for details.\n",
+    "  \n",
+]
+
+
+def make_items(rng, n):
+    return [
+        {
+            "box_2d": [rng.randint(0, 500), rng.randint(0, 500), rng.randint(500, 1000), rng.randint(500, 1000)],
+            "label": rng.choice(LABELS),
+        }
+        for _ in range(n)
+    ]
+
+
+def make_response(rng, items):
+    """Wrap a JSON payload the way models tend to"""
+    body = json.dumps(items, indent=rng.choice([None, 2]))
+    prefix = rng.choice(PREFIXES)
+    if rng.random() < 0.5:
+        return prefix + "```json\n" + body + "\n```\nLet me know if you need more."
+    return prefix + body
+
+
+def old_parse_json(json_output):
+    """The previous segmentation.parse_json, kept for the timing comparison"""
+    lines = json_output.splitlines()
+    for i, line in enumerate(lines):
+        if line == "```json":
+            json_output = "\n".join(lines[i+1:])
+            json_output = json_output.split("```")[0]
+            break
+    return json.loads(json_output)
+
+
+def fuzz(iterations, seed=0):
+    rng = random.Random(seed)
+    recovered = 0
+
+    for _ in range(iterations):
+        items = make_items(rng, rng.randint(1, 12))
+        text = make_response(rng, items)
+
+        # Complete responses must round-trip exactly
+        assert parse_json(text) == items, text
+
+        # Truncated responses must yield a prefix of the real items (or fail cleanly)
+        cut = rng.randint(0, len(text))
+        try:
+            partial = parse_json(text[:cut])
+        except ResponseParseError:
+            continue
+        # Cut before the payload starts: whatever the prose holds ("[1]") is all there is
+        payload_at = 0 if text.startswith("[") else text.find("[", text.find("\n") + 1)
+        if cut <= payload_at:
+            continue
+        assert isinstance(partial, list) and partial == items[:len(partial)], (cut, text)
+        recovered += len(partial)
+
+    # Random garbage must never raise anything but ResponseParseError
+    for _ in range(iterations):
+        junk = "".join(rng.choice('[]{}",:0123456789 abc\n`') for _ in range(rng.randint(0, 60)))
+        try:
+            parse_json(junk)
+        except ResponseParseError:
+            pass
+
+    print(f"Fuzzed {iterations} responses, recovered {recovered} items from truncations")
+
+
+# parse_json_list shapes: (model reply, expected items)
+LIST_CASES = [
+    ('[{"box_2d": [1, 2, 3, 4], "label": "person"}]', [{"box_2d": [1, 2, 3, 4], "label": "person"}]),
+    # A one-detection reply is the item, not its box_2d list
+    ('{"box_2d": [1, 2, 3, 4], "label": "person"}', [{"box_2d": [1, 2, 3, 4], "label": "person"}]),
+    ('```json\n{"box_2d": [1, 2, 3, 4], "label": "cup"}\n```', [{"box_2d": [1, 2, 3, 4], "label": "cup"}]),
+    ('{"detections": [{"box_2d": [1, 2, 3, 4], "label": "door"}]}', [{"box_2d": [1, 2, 3, 4], "label": "door"}]),
+    ('{"detections": []}', []),
+    ('{"ids": [1, 2, 3]}', [{"ids": [1, 2, 3]}]),
+]
+
+
+def check_list_shapes():
+    for text, expected in LIST_CASES:
+        assert parse_json_list(text) == expected, (text, parse_json_list(text))
+    print(f"parse_json_list: {len(LIST_CASES)} reply shapes OK")
+
+
+def bench(iterations=2000):
+    rng = random.Random(1)
+    texts = []
+    for _ in range(50):
+        items = make_items(rng, 20)
+        texts.append("```json\n" + json.dumps(items, indent=2) + "\n```\n")
+
+    for name, fn in [("old", old_parse_json), ("new", parse_json)]:
+        start = time.perf_counter()
+        for i in range(iterations):
+            fn(texts[i % len(texts)])
+        elapsed = time.perf_counter() - start
+        print(f"{name}: {elapsed / iterations * 1e6:.1f} us/response")
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    fuzz(n)
+    check_list_shapes()
+    bench()
@@ -0,0 +1,279 @@
+import argparse
+import base64
+import io
+import json
+import os
+import random
+import sys
+import threading
+import time
+
+import socketio
+from PIL import Image, ImageDraw
+
+# ============================================
+# SOCKET.IO LOAD GENERATOR
+# ============================================
+# Opens N simulated camera clients against a running src/app.py and reports
+# detection latency, errors and dropped frames. Like the phone app, a client
+# skips a capture tick (a dropped frame) while its previous frame is pending.
+#
+# Offline server for capacity runs (no API keys needed). Each client sends its
+# own copies of the frames, but they still repeat every few seconds, so the
+# duplicate-frame cache is turned off to make every frame a real detection:
+#   DETECTOR_BACKEND=stub TTS_BACKEND=stub TTS_LOCAL=0 STUB_DETECT_MS=300 FRAME_CACHE_TTL=0 python src/app.py
+# Then:
+#   python debug/load_test.py --clients 20 --fps 2 --duration 60
+#
+# Needs the Socket.IO client: pip install "python-socketio[client]"
+
+
+def load_frames(frames_dir, count, size):
+    """Images from frames_dir, or `count` synthetic scenes if none given"""
+    frames = []
+    if frames_dir:
+        for filename in sorted(os.listdir(frames_dir)):
+            if os.path.splitext(filename)[1].lower() in (".jpg", ".jpeg", ".png"):
+                with Image.open(os.path.join(frames_dir, filename)) as image:
+                    frames.append(image.convert("RGB"))
+        if not frames:
+            raise SystemExit(f"No images found in {frames_dir}")
+        return frames
+
+    rng = random.Random(0)
+    for _ in range(count):
+        image = Image.new("RGB", size, tuple(rng.randint(0, 255) for _ in range(3)))
+        draw = ImageDraw.Draw(image)
+        for _ in range(rng.randint(2, 6)):
+            x, y = rng.randint(0, size[0] - 40), rng.randint(0, size[1] - 40)
+            w, h = rng.randint(30, size[0] // 2), rng.randint(30, size[1] // 2)
+            draw.rectangle([x, y, x + w, y + h], fill=tuple(rng.randint(0, 255) for _ in range(3)))
+        frames.append(image)
+    return frames
+
+
+def client_frames(images, index):
+    """
+    Base64 JPEGs of `images` marked for client `index`
+
+    A corner patch coloured from the client index changes the bytes, so
+    clients send different scenes rather than one shared set.
+    """
+    color = ((index * 97) % 256, (index * 57) % 256, (index * 31 + 128) % 256)
+    frames = []
+    for image in images:
+        marked = image.copy()
+        ImageDraw.Draw(marked).rectangle([0, 0, 15, 15], fill=color)
+        frames.append(encode(marked))
+    return frames
+
+
+def encode(image):
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=50)
+    return image.size, base64.b64encode(buffer.getvalue()).decode("ascii")
+
+
+class LoadStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = []
+        self.sent = 0
+        self.completed = 0
+        self.errors = 0
+        self.dropped = 0
+        self.timeouts = 0
+        self.connect_failures = 0
+        self.disconnects = 0
+        self.audio_chunks = 0
+        self.bytes_sent = 0
+        self.duplicates = 0     # server ResultCache hits (resent identical frame)
+        self.cached = 0         # scheduler reused the client's last result
+
+    def add(self, **counts):
+        with self.lock:
+            for name, n in counts.items():
+                setattr(self, name, getattr(self, name) + n)
+
+    def record_latency(self, seconds):
+        with self.lock:
+            self.latencies.append(seconds)
+            self.completed += 1
+
+
+class SimulatedCamera(threading.Thread):
+    def __init__(self, index, args, frames, stats, start_at, stop_at):
+        super().__init__(name=f"camera-{index}", daemon=True)
+        self.index = index
+        self.args = args
+        self.frames = frames
+        self.stats = stats
+        self.start_at = start_at
+        self.stop_at = stop_at
+        self.session_id = f"load-{os.getpid()}-{index}"
+        self.pending = None     # (timestamp, sent_at) of the frame awaiting a result
+        self.lock = threading.Lock()
+
+    def _on_result(self, data):
+        now = time.perf_counter()
+        with self.lock:
+            pending, self.pending = self.pending, None
+        if pending is None or data.get("timestamp") != pending[0]:
+            return
+        self.stats.record_latency(now - pending[1])
+        if data.get("duplicate"):
+            self.stats.add(duplicates=1)
+        elif data.get("cached"):
+            self.stats.add(cached=1)
+
+    def _on_error(self, data):
+        with self.lock:
+            self.pending = None
+        self.stats.add(errors=1)
+
+    def run(self):
+        sio = socketio.Client(reconnection=False)
+        sio.on("detection_result", self._on_result)
+        sio.on("detection_diff", self._on_result)
+        sio.on("detection_error", self._on_error)
+        sio.on("audio_chunk", lambda data: self.stats.add(audio_chunks=1))
+        sio.on("disconnect", lambda *_: self.stats.add(disconnects=1))
+
+        time.sleep(max(0.0, self.start_at - time.perf_counter()))
+        try:
+            sio.connect(self.args.url, transports=["websocket"] if self.args.websocket else None,
+                        wait_timeout=10)
+        except Exception as e:
+            print(f"[{self.name}] connect failed: {e}", file=sys.stderr)
+            self.stats.add(connect_failures=1)
+            return
+
+        interval = 1.0 / self.args.fps
+        next_tick = time.perf_counter() + random.uniform(0, interval)
+        frame_index = self.index
+        try:
+            while time.perf_counter() < self.stop_at and sio.connected:
+                time.sleep(max(0.0, next_tick - time.perf_counter()))
+                next_tick += interval
+                now = time.perf_counter()
+
+                with self.lock:
+                    if self.pending is not None and now - self.pending[1] > self.args.timeout:
+                        self.pending = None
+                        self.stats.add(timeouts=1)
+                    if self.pending is not None:
+                        self.stats.add(dropped=1)
+                        continue
+                    # Unique per client; the server echoes it back in the result
+                    timestamp = int(time.time() * 1000) * 1000 + self.index % 1000
+                    self.pending = (timestamp, now)
+
+                (width, height), image = self.frames[frame_index % len(self.frames)]
+                frame_index += 1
+                sio.emit("process_frame", {
+                    "image": image,
+                    "width": width,
+                    "height": height,
+                    "cameraFacing": "back",
+                    "timestamp": timestamp,
+                    "audioStream": self.args.audio_stream,
+                    "audioMode": self.args.audio_mode,
+                    "diffs": self.args.diffs,
+                    "sessionId": self.session_id,
+                })
+                self.stats.add(sent=1, bytes_sent=len(image))
+        finally:
+            # Let the last result arrive before disconnecting
+            deadline = time.perf_counter() + self.args.timeout
+            while self.pending is not None and time.perf_counter() < deadline and sio.connected:
+                time.sleep(0.05)
+            sio.disconnect()
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def summarize(args, stats, elapsed):
+    ms = lambda v: round(v * 1000, 1) if v is not None else None
+    return {
+        "clients": args.clients,
+        "fps_per_client": args.fps,
+        "duration_s": round(elapsed, 1),
+        "sent": stats.sent,
+        "completed": stats.completed,
+        "duplicates": stats.duplicates,
+        "cached": stats.cached,
+        "detected": stats.completed - stats.duplicates - stats.cached,
+        "errors": stats.errors,
+        "timeouts": stats.timeouts,
+        "dropped": stats.dropped,
+        "drop_rate": round(stats.dropped / max(1, stats.dropped + stats.sent), 3),
+        "connect_failures": stats.connect_failures,
+        "disconnects": stats.disconnects,
+        "audio_chunks": stats.audio_chunks,
+        "throughput_fps": round(stats.completed / elapsed, 2) if elapsed else 0,
+        "upload_kbps": round(stats.bytes_sent * 8 / 1000 / elapsed, 1) if elapsed else 0,
+        "p50_ms": ms(percentile(stats.latencies, 0.5)),
+        "p90_ms": ms(percentile(stats.latencies, 0.9)),
+        "p99_ms": ms(percentile(stats.latencies, 0.99)),
+        "max_ms": ms(max(stats.latencies) if stats.latencies else None),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate many camera clients against the detection server")
+    parser.add_argument("--url", default="http://127.0.0.1:5000")
+    parser.add_argument("--clients", type=int, default=10)
+    parser.add_argument("--fps", type=float, default=1.33, help="Capture rate per client (app default: 750 ms)")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds of load after ramp-up")
+    parser.add_argument("--ramp", type=float, default=5.0, help="Seconds over which clients connect")
+    parser.add_argument("--timeout", type=float, default=15.0, help="Seconds before a pending frame counts as lost")
+    parser.add_argument("--frames", help="Directory of .jpg/.png frames (default: synthetic scenes)")
+    parser.add_argument("--synthetic", type=int, default=16, help="Number of synthetic frames")
+    parser.add_argument("--size", default="640x480", help="Synthetic frame size WxH")
+    parser.add_argument("--audio-stream", action="store_true", help="Request streamed audio chunks")
+    parser.add_argument("--audio-mode", default="speech", choices=["speech", "spatial"])
+    parser.add_argument("--diffs", action="store_true", help="Use the detection_diff protocol")
+    parser.add_argument("--websocket", action="store_true", help="Skip long-polling and connect over WebSocket")
+    parser.add_argument("--json-out", help="Append the summary as a JSON line to this file")
+    args = parser.parse_args()
+
+    size = tuple(int(v) for v in args.size.lower().split("x"))
+    images = load_frames(args.frames, args.synthetic, size)
+    stats = LoadStats()
+
+    start = time.perf_counter()
+    stop_at = start + args.ramp + args.duration
+    cameras = [
+        SimulatedCamera(i, args, client_frames(images, i), stats,
+                        start + args.ramp * i / max(1, args.clients), stop_at)
+        for i in range(args.clients)
+    ]
+    print(f"Starting {args.clients} clients at {args.fps} fps against {args.url} "
+          f"({len(images)} frames per client, {args.ramp}s ramp, {args.duration}s load)")
+    for camera in cameras:
+        camera.start()
+
+    while any(camera.is_alive() for camera in cameras):
+        time.sleep(5)
+        with stats.lock:
+            print(f"  t={time.perf_counter() - start:5.0f}s sent={stats.sent} done={stats.completed} "
+                  f"dup={stats.duplicates} cached={stats.cached} err={stats.errors} timeout={stats.timeouts} dropped={stats.dropped}")
+
+    summary = summarize(args, stats, time.perf_counter() - start)
+    print("\n" + "=" * 60)
+    for key, value in summary.items():
+        print(f"{key:>18}: {value}")
+    print("=" * 60)
+
+    if args.json_out:
+        with open(args.json_out, "a") as f:
+            f.write(json.dumps(dict(summary, time=time.time())) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -16,6 +16,65 @@ import io from "socket.io-client";
 // Backend config
 const BACKEND_URL = "http://100.101.43.54:5000";
 
+// Ask the backend to push TTS audio in chunks instead of one base64 clip
+const STREAM_AUDIO = true;
+
+// "speech" for spoken sentences, "spatial" for short stereo earcons panned
+// toward each object (pitch and speed rise as it gets closer)
+const AUDIO_MODE = "speech";
+
+// Receive only added/removed/moved objects ('detection_diff') instead of the
+// full list every frame; the session survives reconnects
+const USE_DIFFS = true;
+
+const BASE64_CHARS = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/";
+
+/** Concatenate binary chunks (ArrayBuffer / Uint8Array) and base64-encode them */
+function chunksToBase64(chunks) {
+  let total = 0;
+  const views = chunks.map((c) => (c instanceof Uint8Array ? c : new Uint8Array(c)));
+  views.forEach((v) => (total += v.length));
+  const bytes = new Uint8Array(total);
+  let offset = 0;
+  views.forEach((v) => {
+    bytes.set(v, offset);
+    offset += v.length;
+  });
+
+  let out = "";
+  for (let i = 0; i < bytes.length; i += 3) {
+    const b0 = bytes[i];
+    const b1 = i + 1 < bytes.length ? bytes[i + 1] : 0;
+    const b2 = i + 2 < bytes.length ? bytes[i + 2] : 0;
+    out += BASE64_CHARS[b0 >> 2];
+    out += BASE64_CHARS[((b0 & 3) << 4) | (b1 >> 4)];
+    out += i + 1 < bytes.length ? BASE64_CHARS[((b1 & 15) << 2) | (b2 >> 6)] : "=";
+    out += i + 2 < bytes.length ? BASE64_CHARS[b2 & 63] : "=";
+  }
+  return out;
+}
+
+/** Apply a detection_diff to the tracked state; returns false on a seq gap */
+function applyDiff(state, diff) {
+  if (diff.baseSeq !== state.seq) return false;
+  diff.removed.forEach((id) => state.byId.delete(id));
+  diff.added.forEach((track) => state.byId.set(track.id, track));
+  diff.moved.forEach((track) => state.byId.set(track.id, track));
+  if (diff.order) {
+    state.order = diff.order;
+  } else {
+    state.order = state.order
+      .filter((id) => state.byId.has(id))
+      .concat(diff.added.map((track) => track.id).filter((id) => !state.order.includes(id)));
+  }
+  state.seq = diff.seq;
+  return true;
+}
+
+function trackList(state) {
+  return state.order.map((id) => state.byId.get(id)).filter(Boolean);
+}
+
 export default function CameraPage() {
   const { themeStyles } = useContext(ThemeContext);
   const { colors, fontFamily, fontSizeMultiplier } = themeStyles;
@@ -38,6 +97,11 @@ export default function CameraPage() {
   const lastFrameTimeRef = useRef(0);
   const intervalRef = useRef(null);
   const connectionAttemptRef = useRef(0);
+  const audioStreamRef = useRef({ id: null, chunks: {} });
+  const audioQueueRef = useRef([]);
+  const isPlayingRef = useRef(false);
+  const sessionIdRef = useRef(`${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`);
+  const tracksRef = useRef({ seq: 0, byId: new Map(), order: [] });
 
   /** ---------------- SOCKET.IO SETUP ---------------- **/
   useEffect(() => {
@@ -60,6 +124,12 @@ export default function CameraPage() {
       setIsConnected(true);
       setConnectionStatus("Connected");
       connectionAttemptRef.current = 0;
+      if (USE_DIFFS) {
+        socketRef.current.emit("resume_session", {
+          sessionId: sessionIdRef.current,
+          lastSeq: tracksRef.current.seq,
+        });
+      }
     });
 
     socketRef.current.on("disconnect", (reason) => {
@@ -110,7 +180,67 @@ export default function CameraPage() {
         if (data.distanceEnabled) setDistanceEnabled(true);
 
         // Play audio if provided
-        if (data.audio) await playAudio(data.audio);
+        if (data.audio) await playAudio(data.audio, data.audioMime);
+      }
+    });
+
+    socketRef.current.on("detection_diff", async (diff) => {
+      isProcessingRef.current = false;
+      const state = tracksRef.current;
+      if (!applyDiff(state, diff)) {
+        // Missed a diff; the server answers with a full snapshot
+        socketRef.current.emit("resume_session", { sessionId: sessionIdRef.current, lastSeq: state.seq });
+        return;
+      }
+      const tracks = trackList(state);
+      setDetectionCount(tracks.length);
+      setLastProcessedTime(new Date().toLocaleTimeString());
+      setBoundingBoxes(tracks);
+      if (diff.distanceEnabled) setDistanceEnabled(true);
+
+      if (diff.audio) await playAudio(diff.audio, diff.audioMime);
+    });
+
+    socketRef.current.on("session_snapshot", (snapshot) => {
+      const state = { seq: snapshot.seq, byId: new Map(), order: [] };
+      snapshot.detections.forEach((track) => {
+        state.byId.set(track.id, track);
+        state.order.push(track.id);
+      });
+      tracksRef.current = state;
+      setBoundingBoxes(trackList(state));
+      setDetectionCount(state.order.length);
+    });
+
+    socketRef.current.on("session_resumed", () => {
+      setBoundingBoxes(trackList(tracksRef.current));
+    });
+
+    // Streamed TTS: chunks arrive in order per sentence; play each sentence
+    // as soon as it is complete instead of waiting for the whole clip
+    socketRef.current.on("audio_chunk", (msg) => {
+      const stream = audioStreamRef.current;
+      if (msg.streamId !== stream.id) {
+        // A bare final for a stream we never heard from carries no audio;
+        // don't cut off the sentence that is playing for it
+        if (!msg.data && !msg.segmentEnd) return;
+        // Newer stream replaces whatever was still queued
+        audioStreamRef.current = { id: msg.streamId, chunks: {} };
+        audioQueueRef.current = [];
+        stopAudio();
+      }
+      const chunks = audioStreamRef.current.chunks;
+
+      if (msg.data) {
+        (chunks[msg.segment] = chunks[msg.segment] || []).push(msg.data);
+      }
+      if (msg.segmentEnd && chunks[msg.segment]) {
+        audioQueueRef.current.push({
+          base64: chunksToBase64(chunks[msg.segment]),
+          mime: msg.mime || "audio/mpeg",
+        });
+        delete chunks[msg.segment];
+        playNextSegment();
       }
     });
 
@@ -133,14 +263,52 @@ export default function CameraPage() {
   }, []);
 
   /** ---------------- AUDIO ---------------- **/
-  async function playAudio(base64Audio) {
+  async function stopAudio() {
+    if (soundRef.current) {
+      const sound = soundRef.current;
+      soundRef.current = null;
+      isPlayingRef.current = false;
+      try {
+        await sound.unloadAsync();
+      } catch (error) {
+        console.error("Error stopping audio:", error);
+      }
+    }
+  }
+
+  async function playNextSegment() {
+    if (isPlayingRef.current || audioQueueRef.current.length === 0) return;
+    isPlayingRef.current = true;
+    const segment = audioQueueRef.current.shift();
+    try {
+      const { sound } = await Audio.Sound.createAsync(
+        { uri: `data:${segment.mime};base64,${segment.base64}` },
+        { shouldPlay: true }
+      );
+      soundRef.current = sound;
+      sound.setOnPlaybackStatusUpdate((status) => {
+        if (status.didJustFinish) {
+          sound.unloadAsync();
+          if (soundRef.current === sound) soundRef.current = null;
+          isPlayingRef.current = false;
+          playNextSegment();
+        }
+      });
+    } catch (error) {
+      console.error("Error playing audio segment:", error);
+      isPlayingRef.current = false;
+      playNextSegment();
+    }
+  }
+
+  async function playAudio(base64Audio, mimeType = "audio/mpeg") {
     try {
       if (soundRef.current) {
         await soundRef.current.unloadAsync();
         soundRef.current = null;
       }
       const { sound } = await Audio.Sound.createAsync(
-        { uri: `data:audio/mpeg;base64,${base64Audio}` },
+        { uri: `data:${mimeType};base64,${base64Audio}` },
         { shouldPlay: true }
       );
       soundRef.current = sound;
@@ -160,7 +328,8 @@ export default function CameraPage() {
     // ADD cameraReady to the condition
     if (permission?.granted && cameraRef.current && isConnected && cameraReady) {
       console.log("🎥 Starting frame capture...");
-      intervalRef.current = setInterval(captureFrame, 1500); // Changed from 1000
+      // The server skips detection on unchanged scenes, so frames can be sent often
+      intervalRef.current = setInterval(captureFrame, 750);
       
       // Capture first frame immediately
       setTimeout(captureFrame, 500);
@@ -178,7 +347,7 @@ export default function CameraPage() {
     }
   
     const now = Date.now();
-    if (now - lastFrameTimeRef.current < 1000) return;
+    if (now - lastFrameTimeRef.current < 500) return;
     
     lastFrameTimeRef.current = now;
     isProcessingRef.current = true;
@@ -203,6 +372,10 @@ export default function CameraPage() {
           height: photo.height,  // ADD THIS
           cameraFacing: cameraPosition,
           timestamp: now,        // ADD THIS
+          audioStream: STREAM_AUDIO,
+          audioMode: AUDIO_MODE,
+          diffs: USE_DIFFS,
+          sessionId: sessionIdRef.current,
         });
         
         console.log("Frame sent successfully");
@@ -304,7 +477,7 @@ export default function CameraPage() {
             const boxColor = getBoxColor(box.distance_m);
             return (
               <View
-                key={index}
+                key={box.id ?? index}
                 style={[
                   styles.boundingBox,
                   {
@@ -1,30 +0,0 @@
-import os
-import azure.cognitiveservices.speech as speechsdk
-
-# This example requires environment variables named "SPEECH_KEY" and "ENDPOINT"
-# Replace with your own subscription key and endpoint, the endpoint is like : "https://YourServiceRegion.api.cognitive.microsoft.com"
-speech_config = speechsdk.SpeechConfig(subscription=os.environ.get('SPEECH_KEY'), endpoint=os.environ.get('ENDPOINT'))
-audio_config = speechsdk.audio.AudioOutputConfig(use_default_speaker=True)
-
-# The neural multilingual voice can speak different languages based on the input text.
-speech_config.speech_synthesis_voice_name='es-AR-TomasNeural' # languages: https://learn.microsoft.com/en-us/azure/ai-services/speech-service/language-support?tabs=tts#text-to-speech
-
-speech_synthesizer = speechsdk.SpeechSynthesizer(speech_config=speech_config, audio_config=audio_config)
-
-# Get text from the console and synthesize to the default speaker.
-
-# what to do: feed it input (not through terminal), and make it loop thru until it exits
-print("Enter some text that you want to speak >")
-text = input()
-
-speech_synthesis_result = speech_synthesizer.speak_text_async(text).get()
-
-if speech_synthesis_result.reason == speechsdk.ResultReason.SynthesizingAudioCompleted:
-    print("Speech synthesized for text [{}]".format(text))
-elif speech_synthesis_result.reason == speechsdk.ResultReason.Canceled:
-    cancellation_details = speech_synthesis_result.cancellation_details
-    print("Speech synthesis canceled: {}".format(cancellation_details.reason))
-    if cancellation_details.reason == speechsdk.CancellationReason.Error:
-        if cancellation_details.error_details:
-            print("Error details: {}".format(cancellation_details.error_details))
-            print("Did you set the speech resource key and endpoint values?")
\ No newline at end of file
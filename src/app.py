@@ -1,143 +1,257 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, abort, Response
 from flask_socketio import SocketIO, emit
 from flask_cors import CORS
 from google import genai
 from google.genai import types
 from PIL import Image
+import numpy as np
 from elevenlabs.client import ElevenLabs
 from elevenlabs import stream 
-import json
 import base64
-import io
 import os
 from dotenv import load_dotenv
 import logging
 import time
+import itertools
+import hmac
+import math
+
+from scene_scheduler import SceneChangeScheduler
+from batcher import MicroBatcher
+from model_client import ResilientModelClient
+from transport import genai_http_options, build_http_client
+from ranking import HazardRanker
+from tts import ElevenLabsBackend, BudgetedTTS, make_local_backend
+from result_cache import ResultCache, frame_key
+from profiler import SamplingProfiler, ProfilerBusy, to_collapsed, to_speedscope
+from image_decode import decode_frame, ImageRejected
+from spatial_audio import EarconRenderer
+from session_diff import SessionDiffer
+from governor import ProviderGovernor, is_rate_limit_error, retry_after_seconds
+from detection_core import DetectionPipeline, DETECT_PROMPT, MODELS_TO_TRY as DEFAULT_MODELS
+from detection_core import ResponseParseError, parse_json_list
 
 # Load environment variables
 load_dotenv()
 
-# Configure logging with more detail
+# Configure logging; per-frame messages are DEBUG, so the default INFO level
+# keeps them (and their formatting) off the hot path. LOG_LEVEL=DEBUG restores
+# them, and /admin/log-level changes levels at runtime.
 logging.basicConfig(
-    level=logging.DEBUG,
+    level=os.environ.get('LOG_LEVEL', 'INFO').upper(),
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
 
+# Socket.IO / Engine.IO packet logging is very chatty; opt in with SOCKETIO_LOGGING=1
+SOCKETIO_LOGGING = os.environ.get('SOCKETIO_LOGGING', '0') == '1'
+
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ.get('GENAI_API_KEY', 'dev-secret-key-change-in-production')
 
 # Enable CORS for all origins
 CORS(app, resources={r"/*": {"origins": "*"}})
 
-# Initialize Socket.IO with verbose logging
+# Initialize Socket.IO
 socketio = SocketIO(
     app,
     cors_allowed_origins="*",
-    logger=True,
-    engineio_logger=True,
+    logger=SOCKETIO_LOGGING,
+    engineio_logger=SOCKETIO_LOGGING,
     ping_timeout=60,
     ping_interval=25,
     async_mode='threading'
 )
 
-# Initialize Gemini client
-api_key = os.environ.get("GENAI_API_KEY")
-if not api_key:
-    raise ValueError("GENAI_API_KEY not set in environment variables")
-
-client = genai.Client(api_key=api_key)
+# DETECTOR_BACKEND=stub and TTS_BACKEND=stub run the server offline without
+# API keys (load tests, debug/load_test.py); STUB_DETECT_MS sets the fake latency
+DETECTOR_BACKEND = os.environ.get('DETECTOR_BACKEND', 'gemini')
+TTS_BACKEND = os.environ.get('TTS_BACKEND', 'elevenlabs')
+
+# Admission control for the paid APIs; 0 disables a limit. Calls over a
+# provider's RPM/TPM, the hourly budget or a client's fair share degrade to the
+# last detections / local TTS instead of running into 429s.
+detect_governor = ProviderGovernor(
+    'gemini',
+    rpm=int(os.environ.get('GEMINI_RPM', 1000)),
+    tpm=int(os.environ.get('GEMINI_TPM', 1_000_000)),
+    per_client_rpm=int(os.environ.get('CLIENT_DETECT_RPM', 60)),
+    budget_per_hour=float(os.environ.get('GEMINI_BUDGET_PER_HOUR', 0)),
+    cost_per_1k_tokens=float(os.environ.get('GEMINI_COST_PER_1K_TOKENS', 0.0001))
+)
+# For TTS the "tokens" are characters
+tts_governor = ProviderGovernor(
+    TTS_BACKEND,
+    rpm=int(os.environ.get('TTS_RPM', 300)),
+    tpm=int(os.environ.get('TTS_CHARS_PER_MIN', 0)),
+    per_client_rpm=int(os.environ.get('CLIENT_TTS_RPM', 20)),
+    budget_per_hour=float(os.environ.get('TTS_BUDGET_PER_HOUR', 0)),
+    cost_per_1k_tokens=float(os.environ.get('TTS_COST_PER_1K_CHARS', 0.30))
+)
 
-elevenlabs_api = os.environ.get("xi-api-key")
-if not elevenlabs_api:
-    raise ValueError("xi-api-key not set in environment variables")
 
-elevenlabs = ElevenLabs(api_key=elevenlabs_api)
+def on_tts_error(error):
+    if is_rate_limit_error(error):
+        tts_governor.throttle(retry_after_seconds(error))
+
+
+# Speech goes to the primary backend unless it misses TTS_BUDGET_MS, then to a
+# local engine (TTS_CLIPS_DIR word clips or pyttsx3). TTS_LOCAL=0 disables the fallback.
+tts_local = None
+if os.environ.get('TTS_LOCAL', '1') != '0':
+    tts_local = make_local_backend(os.environ.get('TTS_CLIPS_DIR', 'tts_clips'))
+if TTS_BACKEND == 'stub':
+    from stubs import StubTTSBackend
+    tts_primary = StubTTSBackend()
+elif TTS_BACKEND == 'azure':
+    # Long-lived Azure worker from speech_synthesis.py
+    from speech_synthesis import SpeechSynthesisWorker
+    tts_primary = SpeechSynthesisWorker()
+else:
+    elevenlabs_api = os.environ.get("xi-api-key")
+    if not elevenlabs_api:
+        raise ValueError("xi-api-key not set in environment variables")
+
+    # Shares one pooled HTTP transport with Gemini (see transport.py for env tuning)
+    elevenlabs = ElevenLabs(api_key=elevenlabs_api, httpx_client=build_http_client())
+    tts_primary = ElevenLabsBackend(elevenlabs)
+tts = BudgetedTTS(
+    tts_primary,
+    tts_local,
+    budget=float(os.environ.get('TTS_BUDGET_MS', 1500)) / 1000.0,
+    on_primary_error=on_tts_error
+)
 
-# Try to find a working model
-MODELS_TO_TRY = ["gemini-2.0-flash-exp", "gemini-1.5-flash", "gemini-1.5-pro"]
-ACTIVE_MODEL = None
+# audioMode 'spatial': one panned earcon per detection instead of sentences.
+# Word clips in EARCON_CLIPS_DIR (<label>.wav, mono 16-bit) replace the tones.
+earcons = EarconRenderer(clips_dir=os.environ.get('EARCON_CLIPS_DIR'))
+
+# Models in order of preference; the resilient client fails over between them.
+# GEMINI_MODELS (comma-separated) overrides the list, e.g. for evaluation runs.
+MODELS_TO_TRY = os.environ.get('GEMINI_MODELS', ','.join(DEFAULT_MODELS)).split(',')
+
+def admit_backup(contents):
+    """
+    Charge the Gemini governor for a hedge or failover request before it is sent
+
+    These are extra billed calls made on behalf of whichever client is
+    waiting (its first call was charged in compute_frame), so they share one
+    'backup' client bucket.
+    """
+    tokens = sum(estimate_detect_tokens(part) for part in contents if hasattr(part, 'size'))
+    return detect_governor.acquire('backup', tokens)
+
+
+if DETECTOR_BACKEND == 'stub':
+    from stubs import StubModelClient
+    model_client = StubModelClient(
+        latency=float(os.environ.get('STUB_DETECT_MS', 300)) / 1000.0,
+        failure_rate=float(os.environ.get('STUB_FAILURE_RATE', 0.0))
+    )
+else:
+    # Initialize Gemini client
+    api_key = os.environ.get("GENAI_API_KEY")
+    if not api_key:
+        raise ValueError("GENAI_API_KEY not set in environment variables")
+
+    client = genai.Client(api_key=api_key, http_options=genai_http_options())
+
+    model_client = ResilientModelClient(
+        client,
+        MODELS_TO_TRY,
+        hedge=os.environ.get('MODEL_HEDGING', '1') != '0',
+        cooldown=float(os.environ.get('MODEL_BREAKER_COOLDOWN', 30.0)),
+        admit_backup=admit_backup
+    )
 
 logger.info("Testing available models...")
-for model in MODELS_TO_TRY:
-    try:
-        test_response = client.models.generate_content(
-            model=model,
-            contents="test"
-        )
-        ACTIVE_MODEL = model
-        logger.info(f"✓ Using model: {ACTIVE_MODEL}")
-        break
-    except Exception as e:
-        logger.warning(f"✗ {model} not available: {e}")
+ACTIVE_MODEL = model_client.probe()
 
 if not ACTIVE_MODEL:
     raise ValueError("No working Gemini model found. Check your API key.")
+logger.info(f"✓ Using model: {ACTIVE_MODEL}")
 
 # Gemini API configuration
 config = types.GenerateContentConfig(
     response_mime_type="application/json"
 )
 
-# Detection prompt
-prompt = "Detect all of the prominent items in the image. The box_2d should be [ymin, xmin, ymax, xmax] normalized to 0-1000."
-
-# Known object dimensions
-KNOWN_OBJECTS = {
-    "person": {"width_cm": 50, "height_cm": 170},
-    "laptop": {"width_cm": 35, "height_cm": 25},
-    "phone": {"width_cm": 7, "height_cm": 15},
-    "bottle": {"width_cm": 7, "height_cm": 20},
-    "cup": {"width_cm": 8, "height_cm": 10},
-    "book": {"width_cm": 15, "height_cm": 20},
-    "chair": {"width_cm": 45, "height_cm": 90},
-    "monitor": {"width_cm": 50, "height_cm": 30},
-    "keyboard": {"width_cm": 45, "height_cm": 15},
-    "mouse": {"width_cm": 6, "height_cm": 10},
-}
-
+# Model call, box parsing and distance estimation (shared with detection2.py)
 FOCAL_LENGTH = 800
+pipeline = DetectionPipeline(model_client, config=config, prompt=DETECT_PROMPT, focal_length=FOCAL_LENGTH)
+
+# Prompt used when several frames are packed into one request
+batch_prompt = (
+    "Each image above is preceded by its index. For every image, detect all of the prominent items. "
+    "The box_2d should be [ymin, xmin, ymax, xmax] normalized to 0-1000. "
+    "Return a JSON list with one entry per image: "
+    '{"image": <index>, "detections": [{"box_2d": [...], "label": "..."}]}.'
+)
 
 
-def distance_to_camera(known_height, focal_length, pixel_height):
-    if pixel_height == 0:
-        return None
-    return (known_height * focal_length) / pixel_height
+def estimate_detect_tokens(pil_image):
+    """Gemini tokens for one detection call: 258 per 768px image tile plus prompt and answer"""
+    width, height = pil_image.size
+    tiles = 1 if width <= 384 and height <= 384 else -(-width // 768) * -(-height // 768)
+    return 258 * tiles + 300
 
 
-def estimate_object_distance(norm_box, label, image_height):
-    object_info = None
-    label_lower = label.lower()
-    
-    if label_lower in KNOWN_OBJECTS:
-        object_info = KNOWN_OBJECTS[label_lower]
-    else:
-        for known_obj, dimensions in KNOWN_OBJECTS.items():
-            if known_obj in label_lower or label_lower in known_obj:
-                object_info = dimensions
-                break
-    
-    if not object_info:
-        return None
-    
-    box_height_normalized = norm_box['height']
-    pixel_height = box_height_normalized * image_height
-    
-    if pixel_height <= 0:
-        return None
-    
-    known_height_cm = object_info['height_cm']
-    distance_cm = distance_to_camera(known_height_cm, FOCAL_LENGTH, pixel_height)
-    
-    if distance_cm is None:
-        return None
-    
-    distance_m = round(distance_cm / 100, 2)
-    
-    if distance_m < 0.1 or distance_m > 100:
-        return None
-    
-    return distance_m
+def detect_single(pil_image):
+    return pipeline.detect(pil_image)
+
+
+def detect_batch(images):
+    """Send several frames in one request and split the answer back per image"""
+    if len(images) == 1:
+        try:
+            return [detect_single(images[0])]
+        except Exception as e:
+            return [e]
+
+    contents = []
+    for i, image in enumerate(images):
+        contents.append(f"Image {i}:")
+        contents.append(image)
+    contents.append(batch_prompt)
+
+    response = model_client.generate_content(
+        contents=contents,
+        config=config
+    )
+
+    results = [None] * len(images)
+    for entry in parse_json_list(response.text):
+        if not isinstance(entry, dict):
+            continue
+        index = entry.get('image')
+        if isinstance(index, int) and 0 <= index < len(images):
+            results[index] = entry.get('detections', [])
+
+    return [
+        r if r is not None else ResponseParseError(f"No result for image {i} in batched response")
+        for i, r in enumerate(results)
+    ]
+
+
+# Opt-in micro-batching of frames from all clients (BATCH_MAX_SIZE > 1)
+BATCH_MAX_SIZE = int(os.environ.get('BATCH_MAX_SIZE', 1))
+BATCH_MAX_WAIT_MS = float(os.environ.get('BATCH_MAX_WAIT_MS', 50))
+
+batcher = None
+if BATCH_MAX_SIZE > 1:
+    batcher = MicroBatcher(
+        detect_batch,
+        max_batch_size=BATCH_MAX_SIZE,
+        max_wait=BATCH_MAX_WAIT_MS / 1000.0
+    )
+    logger.info(f"Batching enabled: up to {BATCH_MAX_SIZE} frames per call, {BATCH_MAX_WAIT_MS}ms window")
+
+
+def detect_boxes(pil_image):
+    """Raw Gemini detections for one frame, batched with other clients if enabled"""
+    if batcher is not None:
+        return batcher.submit(pil_image).result()
+    return detect_single(pil_image)
 
 
 # Add a simple HTTP endpoint for testing
@@ -145,7 +259,7 @@ def estimate_object_distance(norm_box, label, image_height):
 def index():
     return jsonify({
         'status': 'running',
-        'model': ACTIVE_MODEL,
+        'model': model_client.active_model,
         'message': 'Object detection server is running',
         'endpoints': {
             'http': '/',
@@ -155,9 +269,49 @@ def index():
 
 objects_said = set()
 
-def txttospeech(objects_to_be_said):
-    chunk_lst = []   
-    diff_check = False
+# Per-client detection cadence: Gemini only runs when the scene changed,
+# the client reports movement, or the last result is too old
+SCENE_CHANGE_THRESHOLD = float(os.environ.get('SCENE_CHANGE_THRESHOLD', 12.0))
+DETECT_MIN_INTERVAL = float(os.environ.get('DETECT_MIN_INTERVAL', 0.5))
+DETECT_MAX_STALENESS = float(os.environ.get('DETECT_MAX_STALENESS', 5.0))
+
+schedulers = {}
+last_results = {}
+
+# Exact-duplicate frames from the same connection within FRAME_CACHE_TTL seconds skip Gemini and TTS
+result_cache = ResultCache(
+    ttl=float(os.environ.get('FRAME_CACHE_TTL', 10.0)),
+    max_entries=int(os.environ.get('FRAME_CACHE_SIZE', 256))
+)
+
+# Most urgent detections first, capped to DETECTION_TOP_K (0 = no cap)
+ranker = HazardRanker(top_k=int(os.environ.get('DETECTION_TOP_K', 5)))
+
+# Clients that send diffs=True and a sessionId get 'detection_diff' events
+# instead of full results; sessions survive reconnects for SESSION_RESUME_TTL
+session_diffs = SessionDiffer(ttl=float(os.environ.get('SESSION_RESUME_TTL', 300.0)))
+
+
+def get_scheduler(client_id):
+    scheduler = schedulers.get(client_id)
+    if scheduler is None:
+        scheduler = SceneChangeScheduler(
+            change_threshold=SCENE_CHANGE_THRESHOLD,
+            min_interval=DETECT_MIN_INTERVAL,
+            max_staleness=DETECT_MAX_STALENESS
+        )
+        schedulers[client_id] = scheduler
+    return scheduler
+
+def tts_texts(objects_to_be_said, dedupe=True):
+    """
+    Sentences to speak for this frame
+
+    With dedupe, returns [] unless something new is in view. Diff clients
+    pass dedupe=False with only the objects that were added.
+    """
+    texts = []
+    diff_check = not dedupe
 
     for o in objects_to_be_said:
         if o[0] not in objects_said:
@@ -167,44 +321,211 @@ def txttospeech(objects_to_be_said):
     if diff_check:
         for o in objects_to_be_said:
             if o[1]:
-                s = o[0] + " " + str(o[1]) + " centimeters away"
-                audio_stream = elevenlabs.text_to_speech.stream(
-                    text=s,
-                    voice_id="Myn1LuZgd2qPMOg9BNtC",
-                    model_id="eleven_multilingual_v2"
-                )
-                for chunk in audio_stream:
-                    if isinstance(chunk, bytes):
-                        chunk_lst.append(chunk)
+                texts.append(o[0] + " " + str(o[1]) + " centimeters away")
             else:
-                audio_stream = elevenlabs.text_to_speech.stream(
-                    text=o[0],
-                    voice_id="Myn1LuZgd2qPMOg9BNtC",
-                    model_id="eleven_multilingual_v2"
-                )
-                for chunk in audio_stream:
-                    if isinstance(chunk, bytes):
-                        chunk_lst.append(chunk)
-
-    objects_said.clear()
-    for o in objects_to_be_said:
-        objects_said.add(o[0])
+                texts.append(o[0])
+
+    if dedupe:
+        objects_said.clear()
+        for o in objects_to_be_said:
+            objects_said.add(o[0])
+
+    return texts
+
 
-    if chunk_lst:
-        audio_data = b''.join(chunk_lst)
+def cloud_tts_allowed(client_id, text):
+    """
+    Charge the TTS governor for one cloud request speaking `text`
+
+    Returns:
+        True to use the cloud backend, False for local TTS, None to skip
+        audio (over quota and no local backend)
+    """
+    if tts_governor.acquire(client_id, len(text)):
+        return True
+    return False if tts.fallback is not None else None
+
+
+def txttospeech(objects_to_be_said, dedupe=True, client_id=None):
+    """
+    Returns:
+        (base64 audio, mime type), or (None, None) if there is nothing new to say
+    """
+    texts = tts_texts(objects_to_be_said, dedupe)
+    if not texts:
+        return None, None
+
+    # One request for the whole scene instead of one per object
+    text = ". ".join(texts)
+    use_primary = cloud_tts_allowed(client_id, text)
+    if use_primary is None:
+        return None, None
+
+    audio_data, mime_type = tts.synthesize(text, use_primary=use_primary)
+    if audio_data:
         audio_base64 = base64.b64encode(audio_data).decode('utf-8')
-        return audio_base64
+        return audio_base64, mime_type
   
-    return None
+    return None, None
+
+
+audio_stream_ids = itertools.count(1)
+
+
+def render_earcons(detections):
+    """
+    Returns:
+        (base64 WAV, mime type), or (None, None) for an empty list
+    """
+    wav = earcons.render(detections)
+    if wav:
+        return base64.b64encode(wav).decode('utf-8'), 'audio/wav'
+    return None, None
 
 
+def plan_speech(objects_to_be_said, dedupe=True, client_id=None):
+    """
+    Decide what a streamed response will say, before it gets a stream id
+
+    Each sentence is its own TTS request, so each is charged to the governor
+    separately; sentences refused with no local backend are dropped.
+
+    Returns:
+        List of (sentence, use_primary) for stream_tts, or None if nothing
+        will be spoken (nothing new, or over quota with no local backend)
+    """
+    speech = []
+    for text in tts_texts(objects_to_be_said, dedupe):
+        use_primary = cloud_tts_allowed(client_id, text)
+        if use_primary is not None:
+            speech.append((text, use_primary))
+    return speech or None
+
+
+def stream_tts(speech, stream_id):
+    """
+    Forward TTS audio to the current client as binary 'audio_chunk' events
+
+    Every chunk carries the stream id, a running sequence number and the
+    index of the sentence (segment) it belongs to. A chunk-less event with
+    segmentEnd marks the end of each sentence so the client can start playing
+    it while later sentences are still being synthesized; final ends the stream,
+    and is sent even if synthesis fails part-way.
+
+    Args:
+        speech: (sentence, use_primary) pairs from plan_speech
+
+    Returns:
+        Number of chunks sent
+    """
+    seq = 0
+    try:
+        for segment, (text, use_primary) in enumerate(speech):
+            chunks, mime_type = tts.stream(text, use_primary=use_primary)
+            for chunk in chunks:
+                emit('audio_chunk', {'streamId': stream_id, 'seq': seq, 'segment': segment, 'mime': mime_type, 'data': chunk})
+                seq += 1
+            emit('audio_chunk', {'streamId': stream_id, 'seq': seq, 'segment': segment, 'mime': mime_type, 'segmentEnd': True})
+            seq += 1
+    except Exception as e:
+        logger.error(f'TTS stream {stream_id} failed after {seq} chunks: {e}')
+    finally:
+        emit('audio_chunk', {'streamId': stream_id, 'seq': seq, 'final': True})
+    return seq
+
 
 @app.route('/health')
 def health():
     return jsonify({
         'status': 'healthy',
         'timestamp': time.time(),
-        'model': ACTIVE_MODEL
+        'model': model_client.active_model,
+        'models': model_client.stats(),
+        'tts': tts.stats(),
+        'frameCache': result_cache.stats(),
+        'sessions': session_diffs.stats(),
+        'governor': {'detect': detect_governor.stats(), 'tts': tts_governor.stats()},
+        'batching': batcher.stats() if batcher else None
+    })
+
+
+# ---------------- Admin (profiling / logging) ----------------
+# Enabled only when ADMIN_TOKEN is set; requests must send it as X-Admin-Token.
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+MAX_PROFILE_SECONDS = 60
+MIN_PROFILE_INTERVAL_MS = 1.0
+
+profiler = SamplingProfiler()
+
+
+def require_admin():
+    if not ADMIN_TOKEN:
+        abort(404)
+    # Constant-time comparison so response timing doesn't leak the token
+    supplied = request.headers.get('X-Admin-Token', '').encode('utf-8')
+    if not hmac.compare_digest(supplied, ADMIN_TOKEN.encode('utf-8')):
+        abort(403)
+
+
+def positive_arg(name, default):
+    """
+    Query parameter as a positive finite float
+
+    Returns:
+        The value, or None if it is not a number or not positive
+    """
+    try:
+        value = float(request.args.get(name, default))
+    except ValueError:
+        return None
+    return value if math.isfinite(value) and value > 0 else None
+
+
+@app.route('/admin/profile')
+def admin_profile():
+    """
+    Sample every server thread for ?seconds=N (default 10) and return the profile
+
+    ?format=collapsed (flamegraph.pl / speedscope text) or speedscope (JSON)
+    ?interval_ms=5 sets the sampling interval (at least 1 ms)
+    """
+    require_admin()
+    seconds = positive_arg('seconds', 10)
+    interval_ms = positive_arg('interval_ms', 5)
+    if seconds is None or interval_ms is None:
+        return jsonify({'error': 'seconds and interval_ms must be positive numbers'}), 400
+    seconds = min(seconds, MAX_PROFILE_SECONDS)
+    interval = max(interval_ms, MIN_PROFILE_INTERVAL_MS) / 1000.0
+    fmt = request.args.get('format', 'collapsed')
+
+    try:
+        counts, duration = profiler.sample(seconds, interval)
+    except ProfilerBusy as e:
+        return jsonify({'error': str(e)}), 409
+
+    logger.info(f'Profile captured: {sum(counts.values())} samples over {duration:.1f}s')
+    if fmt == 'speedscope':
+        return jsonify(to_speedscope(counts, interval, name=f'app.py {duration:.1f}s'))
+    return Response(to_collapsed(counts), mimetype='text/plain')
+
+
+@app.route('/admin/log-level', methods=['GET', 'POST'])
+def admin_log_level():
+    """GET current levels; POST {"level": "DEBUG", "logger": "<name, optional>"} to change one"""
+    require_admin()
+    if request.method == 'POST':
+        body = request.get_json(silent=True) or {}
+        level = str(body.get('level', '')).upper()
+        if level not in ('DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'):
+            return jsonify({'error': f'Invalid level: {level}'}), 400
+        target = body.get('logger')
+        logging.getLogger(target).setLevel(level)
+        logger.warning(f"Log level of {target or 'root'} set to {level}")
+
+    names = ['root', __name__, 'socketio', 'engineio', 'werkzeug']
+    return jsonify({
+        name: logging.getLevelName(logging.getLogger(None if name == 'root' else name).getEffectiveLevel())
+        for name in names
     })
 
 
@@ -220,7 +541,7 @@ def handle_connect():
     
     emit('connection_status', {
         'status': 'connected',
-        'model': ACTIVE_MODEL,
+        'model': model_client.active_model,
         'message': 'Successfully connected to object detection server with distance estimation',
         'server_time': time.time()
     })
@@ -229,9 +550,198 @@ def handle_connect():
 @socketio.on('disconnect')
 def handle_disconnect():
     client_id = request.sid
+    schedulers.pop(client_id, None)
+    last_results.pop(client_id, None)
+    ranker.forget(client_id)
+    detect_governor.forget(client_id)
+    tts_governor.forget(client_id)
     logger.info(f'✗ Client disconnected: {client_id}')
 
 
+# Frame decoding limits
+# 768 fits one Gemini image tile; larger frames are tiled and cost more tokens
+DECODE_MAX_DIM = int(os.environ.get('DECODE_MAX_DIM', 768))
+MAX_IMAGE_BYTES = int(os.environ.get('MAX_IMAGE_BYTES', 8 * 1024 * 1024))
+MAX_IMAGE_PIXELS = int(os.environ.get('MAX_IMAGE_PIXELS', 40_000_000))
+
+
+def detections_from_boxes(bounding_boxes, image_height):
+    """
+    Convert raw Gemini boxes (box_2d in 0-1000) into normalized detections with distances
+
+    Args:
+        bounding_boxes: Parsed model output
+        image_height: Original frame height in pixels (distance calibration)
+
+    Returns:
+        List of detection dicts (unranked), malformed boxes skipped
+    """
+    return [det.to_dict() for det in pipeline.convert(bounding_boxes, image_height)]
+
+
+def decode_client_frame(image_bytes, width=None, height=None):
+    """
+    decode_frame with the server's size limits (DECODE_MAX_DIM, MAX_IMAGE_*)
+
+    The one place frames are decoded, so the server and the evaluation
+    harness always see the same image.
+
+    Raises:
+        ImageRejected: For payloads decode_frame refuses
+    """
+    return decode_frame(
+        image_bytes,
+        width,
+        height,
+        max_dim=DECODE_MAX_DIM,
+        max_bytes=MAX_IMAGE_BYTES,
+        max_pixels=MAX_IMAGE_PIXELS
+    )
+
+
+def run_detection(image_bytes, width=None, height=None):
+    """
+    Decode one frame, detect objects and estimate distances
+
+    The stateless core of compute_frame: no scene scheduling, ranking, caching
+    or audio. debug/eval_detection.py scores this against labeled frames.
+
+    Returns:
+        (unranked detection dicts, (original width, original height))
+
+    Raises:
+        ImageRejected: For payloads decode_frame refuses
+        Exception: Whatever the model client or response parser raised
+    """
+    pil_image, (width, height) = decode_client_frame(image_bytes, width, height)
+    return detections_from_boxes(detect_boxes(pil_image), height), (width, height)
+
+
+class FrameError(Exception):
+    """A frame that can't be processed; the message goes back as detection_error"""
+
+
+def reuse_result(previous, timestamp, start_time, **flags):
+    """The client's last result re-stamped for this frame, without audio"""
+    result = dict(previous, **flags)
+    result['timestamp'] = timestamp
+    result['processingTime'] = round(time.time() - start_time, 3)
+    result['cached'] = True
+    result['audio'] = None
+    return result
+
+
+def compute_frame(client_id, image_bytes, data, start_time):
+    """
+    Run the detection pipeline for one decoded frame
+
+    Returns:
+        (payload for detection_result, objects still to be streamed as audio or None)
+
+    Raises:
+        FrameError: For client-visible failures
+    """
+    timestamp = data.get('timestamp')
+    stream_audio = bool(data.get('audioStream'))
+    spatial_audio = data.get('audioMode') == 'spatial'
+    diff_mode = bool(data.get('diffs') and data.get('sessionId'))
+
+    # Load image, decoding JPEGs straight at DECODE_MAX_DIM; width/height stay
+    # the original size because distance estimation is calibrated on it
+    try:
+        pil_image, (width, height) = decode_client_frame(image_bytes, data.get('width'), data.get('height'))
+        logger.debug('[%s] Image size: %sx%s (decoded at %sx%s)', client_id, width, height, *pil_image.size)
+    except ImageRejected as e:
+        logger.error(f'[{client_id}] Rejected image: {e}')
+        raise FrameError(f'Failed to process image: {e}')
+    
+    # Skip Gemini if the scene hasn't changed since the last detection
+    scheduler = get_scheduler(client_id)
+    previous = last_results.get(client_id)
+    thumbnail = np.asarray(pil_image.resize(scheduler.thumbnail_size, Image.NEAREST).convert('L'))
+    if not scheduler.should_detect(thumbnail, moving=bool(data.get('moving')), force=previous is None):
+        logger.debug('[%s] Scene unchanged (score %.1f), reusing last detections', client_id, scheduler.last_score)
+        return reuse_result(previous, timestamp, start_time), None
+    
+    # Stay inside the Gemini quota; over the limit, reuse the last result and
+    # retry on the next frame the governor admits
+    if not detect_governor.acquire(client_id, estimate_detect_tokens(pil_image)):
+        scheduler.reset()
+        if previous is None:
+            wait = detect_governor.retry_after(client_id)
+            raise FrameError(f'Detection busy, retrying in {wait:.1f}s')
+        logger.debug('[%s] Detection throttled, reusing last detections', client_id)
+        return reuse_result(previous, timestamp, start_time, throttled=True), None
+    
+    # Call Gemini API
+    try:
+        logger.debug('[%s] Calling Gemini API...', client_id)
+        api_start = time.time()
+        
+        bounding_boxes = detect_boxes(pil_image)
+        
+        api_time = time.time() - api_start
+        logger.debug('[%s] Gemini detected %d objects in %.2fs', client_id, len(bounding_boxes), api_time)
+        
+    except ResponseParseError as e:
+        logger.error(f'[{client_id}] Unparseable Gemini response: {e}')
+        raise FrameError(f'AI model returned invalid JSON: {str(e)}')
+    except Exception as e:
+        if is_rate_limit_error(e):
+            detect_governor.throttle(retry_after_seconds(e))
+            scheduler.reset()
+            if previous is not None:
+                return reuse_result(previous, timestamp, start_time, throttled=True), None
+        logger.error(f'[{client_id}] Gemini API error: {e}')
+        raise FrameError(f'AI model error: {str(e)}')
+    
+    detections = detections_from_boxes(bounding_boxes, height)
+    
+    # Hazard-first order; TTS below speaks them in this order too
+    total_detected = len(detections)
+    detections = ranker.rank(client_id, detections)
+    
+    processing_time = time.time() - start_time
+    
+    result = {
+        'success': True,
+        'detections': detections,
+        'count': len(detections),
+        'totalDetected': total_detected,
+        'timestamp': timestamp,
+        'processingTime': round(processing_time, 3),
+        'distanceEnabled': True,
+        'cached': False
+    }
+    last_results[client_id] = result
+    
+    logger.debug('[%s] Sending %d detections (processed in %.3fs)', client_id, len(detections), processing_time)
+    
+    if diff_mode:
+        # Audio depends on what this session already has; see emit_diff
+        return dict(result, audio=None), None
+
+    if spatial_audio:
+        # A few hundred ms of panned cues is cheap enough to always send inline
+        audio_base64, audio_mime = render_earcons(detections)
+        return dict(result, audio=audio_base64, audioMime=audio_mime), None
+
+    objects_for_tts = [(det['label'], det.get('distance_m')) for det in detections]
+
+    if stream_audio:
+        # Boxes go out first; the caller then pushes audio as TTS produces it.
+        # Only a response that will actually speak gets a stream id
+        speech = plan_speech(objects_for_tts, client_id=client_id) if detections else None
+        stream_id = next(audio_stream_ids) if speech else None
+        return dict(result, audio=None, audioStreamId=stream_id), speech
+
+    audio_base64, audio_mime = None, None
+    if detections:  
+        audio_base64, audio_mime = txttospeech(objects_for_tts, client_id=client_id)
+
+    return dict(result, audio=audio_base64, audioMime=audio_mime), None
+
+
 @socketio.on('process_frame')
 def handle_frame(data):
     start_time = time.time()
@@ -249,7 +759,13 @@ def handle_frame(data):
             emit('detection_error', {'error': 'No image provided'})
             return
         
-        logger.info(f'[{client_id}] Processing frame - Camera: {camera_facing}, Size: {original_width}x{original_height}')
+        logger.debug('[%s] Processing frame - Camera: %s, Size: %sx%s', client_id, camera_facing, original_width, original_height)
+        
+        # Reject oversized payloads before spending time decoding them
+        if len(base64_image) * 3 // 4 > MAX_IMAGE_BYTES:
+            logger.error(f'[{client_id}] Payload too large: {len(base64_image)} base64 chars')
+            emit('detection_error', {'error': 'Image too large'})
+            return
         
         # Decode base64
         try:
@@ -257,111 +773,112 @@ def handle_frame(data):
                 base64_image = base64_image.split(',')[1]
             
             image_bytes = base64.b64decode(base64_image)
-            logger.debug(f'[{client_id}] Decoded {len(image_bytes)} bytes')
+            logger.debug('[%s] Decoded %d bytes', client_id, len(image_bytes))
         except Exception as e:
             logger.error(f'[{client_id}] Failed to decode base64: {e}')
             emit('detection_error', {'error': 'Invalid base64 image'})
             return
         
-        # Load image
+        # Frames resent on the same connection reuse the stored or in-flight result.
+        # The key includes the sid: compute_frame updates per-client state
+        # (scheduler, ranker, sessions, governor) and streams audio to this sid
+        # only, so another client (or this one after a reconnect) must compute
+        # its own result
+        key = frame_key(image_bytes, client_id, camera_facing, original_width, original_height,
+                        bool(data.get('audioStream')), data.get('audioMode'), bool(data.get('diffs')))
         try:
-            image_buffer = io.BytesIO(image_bytes)
-            pil_image = Image.open(image_buffer)
-            width, height = pil_image.size
-            logger.debug(f'[{client_id}] Image size: {width}x{height}')
-        except Exception as e:
-            logger.error(f'[{client_id}] Failed to load image: {e}')
-            emit('detection_error', {'error': 'Failed to process image'})
-            return
-        
-        # Call Gemini API
-        try:
-            logger.debug(f'[{client_id}] Calling Gemini API...')
-            api_start = time.time()
-            
-            response = client.models.generate_content(
-                model=ACTIVE_MODEL,
-                contents=[pil_image, prompt],
-                config=config
+            (payload, pending_audio), status = result_cache.get_or_compute(
+                key, lambda: compute_frame(client_id, image_bytes, data, start_time)
             )
-            
-            api_time = time.time() - api_start
-            bounding_boxes = json.loads(response.text)
-            logger.info(f'[{client_id}] Gemini detected {len(bounding_boxes)} objects in {api_time:.2f}s')
-            
-        except Exception as e:
-            logger.error(f'[{client_id}] Gemini API error: {e}')
-            emit('detection_error', {'error': f'AI model error: {str(e)}'})
+        except FrameError as e:
+            emit('detection_error', {'error': str(e)})
             return
         
-        # Process detections
-        detections = []
-        for bbox in bounding_boxes:
-            try:
-                norm_y1 = bbox["box_2d"][0] / 1000.0
-                norm_x1 = bbox["box_2d"][1] / 1000.0
-                norm_y2 = bbox["box_2d"][2] / 1000.0
-                norm_x2 = bbox["box_2d"][3] / 1000.0
-                
-                norm_width = norm_x2 - norm_x1
-                norm_height = norm_y2 - norm_y1
-                
-                norm_box = {
-                    'x': norm_x1,
-                    'y': norm_y1,
-                    'width': norm_width,
-                    'height': norm_height
-                }
-                
-                label = bbox.get('label', 'object')
-                distance_m = estimate_object_distance(norm_box, label, height)
-                
-                detection = {
-                    'x': norm_x1,
-                    'y': norm_y1,
-                    'width': norm_width,
-                    'height': norm_height,
-                    'label': label,
-                    'confidence': bbox.get('confidence', 0.9),
-                    'distance_m': distance_m
-                }
-                
-                detections.append(detection)
-                
-            except (KeyError, IndexError) as e:
-                logger.warning(f'[{client_id}] Skipping malformed bbox: {e}')
-                continue
-        
-        processing_time = time.time() - start_time
-        
-        result = {
-            'success': True,
-            'detections': detections,
-            'count': len(detections),
-            'timestamp': timestamp,
-            'processingTime': round(processing_time, 3),
-            'distanceEnabled': True
-        }
+        if data.get('diffs') and data.get('sessionId'):
+            emit_diff(data['sessionId'], payload, data, start_time)
+            return
         
-        logger.info(f'[{client_id}] Sending {len(detections)} detections (processed in {processing_time:.3f}s)')
+        if status != ResultCache.MISS:
+            logger.debug('[%s] Duplicate frame (%s), returning stored result', client_id, status)
+            emit('detection_result', dict(
+                payload,
+                timestamp=timestamp,
+                processingTime=round(time.time() - start_time, 3),
+                duplicate=True
+            ))
+            return
         
-        audio_base64 = None
-        if detections:  
-            objects_for_tts = [(det['label'], det.get('distance_m')) for det in detections]
-            audio_base64 = txttospeech(objects_for_tts)
-
-        result['audio'] = audio_base64
-        emit('detection_result', result)
+        emit('detection_result', payload)
+        if pending_audio:
+            stream_tts(pending_audio, payload['audioStreamId'])
         
     except Exception as e:
         logger.error(f'[{client_id}] Unexpected error: {e}', exc_info=True)
         emit('detection_error', {'error': 'Server error occurred'})
 
 
+def emit_diff(session_id, payload, data, start_time):
+    """
+    Send what changed since the session's last result as 'detection_diff'
+
+    Only added objects are spoken (or rendered as earcons), so a scene that
+    merely shifts produces no audio at all.
+    """
+    diff = session_diffs.update(session_id, payload['detections'])
+    message = {k: v for k, v in payload.items() if k not in ('detections', 'audio')}
+    message.update(
+        diff,
+        sessionId=session_id,
+        timestamp=data.get('timestamp'),
+        processingTime=round(time.time() - start_time, 3),
+        audio=None
+    )
+
+    added = diff['added']
+    pending_audio = None
+    if added:
+        if data.get('audioMode') == 'spatial':
+            message['audio'], message['audioMime'] = render_earcons(added)
+        elif data.get('audioStream'):
+            objects = [(det['label'], det.get('distance_m')) for det in added]
+            pending_audio = plan_speech(objects, dedupe=False, client_id=request.sid)
+            if pending_audio:
+                message['audioStreamId'] = next(audio_stream_ids)
+        else:
+            objects = [(det['label'], det.get('distance_m')) for det in added]
+            message['audio'], message['audioMime'] = txttospeech(objects, dedupe=False, client_id=request.sid)
+
+    logger.debug('[%s] Diff seq %d: +%d -%d ~%d', session_id, diff['seq'],
+                 len(added), len(diff['removed']), len(diff['moved']))
+    emit('detection_diff', message)
+    if pending_audio:
+        stream_tts(pending_audio, message['audioStreamId'])
+
+
+@socketio.on('resume_session')
+def handle_resume(data):
+    """
+    A (re)connecting diff client reports the last seq it applied; it gets
+    'session_resumed' if that is current, else a full 'session_snapshot'
+    """
+    session_id = (data or {}).get('sessionId')
+    if not session_id:
+        emit('detection_error', {'error': 'No sessionId provided'})
+        return
+
+    last_seq = data.get('lastSeq')
+    snapshot = session_diffs.resume(session_id, last_seq)
+    if snapshot is None:
+        emit('session_resumed', {'sessionId': session_id, 'seq': last_seq})
+    else:
+        logger.info(f'[{request.sid}] Resyncing session {session_id} at seq {snapshot["seq"]} (client had {last_seq})')
+        emit('session_snapshot', dict(snapshot, sessionId=session_id))
+
+
 @socketio.on('ping')
 def handle_ping():
     client_id = request.sid
-    logger.debug(f'[{client_id}] Received ping')
+    logger.debug('[%s] Received ping', client_id)
     emit('pong', {'timestamp': time.time()})
 
 
@@ -0,0 +1,102 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+class MicroBatcher:
+    """
+    Collects items submitted from many threads into small batches
+
+    The first item of a batch opens a window of max_wait seconds; the batch is
+    dispatched when the window closes or max_batch_size items have arrived.
+    process_batch receives a list of items and must return a list of results
+    in the same order (an Exception in the list fails only that item).
+    """
+
+    def __init__(self, process_batch, max_batch_size=4, max_wait=0.05, max_in_flight=2,
+                 name="batcher"):
+        """
+        Args:
+            process_batch: Callable(list of items) -> list of results
+            max_batch_size: Largest batch sent in one call
+            max_wait: Longest time (seconds) an item waits for others to join
+            max_in_flight: Batches that may be processed concurrently
+        """
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+
+        self._queue = queue.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix=name)
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        self._total_wait = 0.0
+        self._total_latency = 0.0
+        self._started = time.time()
+
+        self._collector = threading.Thread(target=self._collect, name=f"{name}-collector", daemon=True)
+        self._collector.start()
+
+    def submit(self, item):
+        """Queue an item; returns a Future for its result."""
+        future = Future()
+        self._queue.put((item, future, time.time()))
+        return future
+
+    def _collect(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._executor.submit(self._dispatch, batch)
+
+    def _dispatch(self, batch):
+        dispatched = time.time()
+        items = [item for item, _, _ in batch]
+
+        try:
+            results = self.process_batch(items)
+            if len(results) != len(items):
+                raise ValueError(f"Batch returned {len(results)} results for {len(items)} items")
+        except Exception as e:
+            results = [e] * len(items)
+
+        finished = time.time()
+        for (_, future, queued), result in zip(batch, results):
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+        with self._stats_lock:
+            self._batches += 1
+            self._items += len(batch)
+            self._total_wait += sum(dispatched - queued for _, _, queued in batch)
+            self._total_latency += finished - dispatched
+
+    def stats(self):
+        """Batch size, queueing delay, call latency and throughput so far"""
+        with self._stats_lock:
+            batches = self._batches or 1
+            items = self._items or 1
+            elapsed = time.time() - self._started
+            return {
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': round(self.max_wait * 1000, 1),
+                'batches': self._batches,
+                'items': self._items,
+                'avg_batch_size': round(self._items / batches, 2),
+                'avg_queue_wait_ms': round(self._total_wait / items * 1000, 1),
+                'avg_batch_latency_ms': round(self._total_latency / batches * 1000, 1),
+                'items_per_second': round(self._items / elapsed, 3) if elapsed else 0.0,
+                'pending': self._queue.qsize(),
+            }
@@ -1,265 +1,371 @@
 from google import genai
-from google.genai import types
 from PIL import Image
 import json
 import cv2
 import numpy as np
 import os
+import argparse
 from dotenv import load_dotenv
 import threading
 import time
 
+from frame_ring import FrameRing, CaptureThread
+from scene_scheduler import SceneChangeScheduler
+from detection_core import DetectionPipeline, SingleModelClient, json_config, probe_models
+
 # Load environment variables from .env file
 load_dotenv()
 
-# Initialize client with API key
-api_key = os.environ.get("GENAI_API_KEY")
-if not api_key:
-    raise ValueError("Please set GENAI_API_KEY in your .env file")
+FOCAL_LENGTH = 350  # Webcam at 640x480, needs calibration
+
+
+def build_pipeline():
+    """Gemini client pinned to the first working model"""
+    api_key = os.environ.get("GENAI_API_KEY")
+    if not api_key:
+        raise ValueError("Please set GENAI_API_KEY in your .env file")
+
+    client = genai.Client(api_key=api_key)
+
+    print("Testing available models...")
+    model = probe_models(client)
+    if not model:
+        raise ValueError("No working Gemini model found. Check your API key.")
+    print(f"Using model: {model}")
+
+    return DetectionPipeline(SingleModelClient(client, model), config=json_config(), focal_length=FOCAL_LENGTH)
+
+
+def detect_frame(pipeline, pil_image):
+    """Run Gemini on one RGB frame and return a tuple of Detection"""
+    print(f"Processing frame...")
+    new_detections = tuple(pipeline.run(pil_image))
+
+    print(f"Detected {len(new_detections)} objects:")
+    for det in new_detections:
+        if det.distance_m:
+            print(f"  - {det.label}: {det.distance_m}m")
+        else:
+            print(f"  - {det.label}: (distance unknown)")
+
+    return new_detections
+
+
+class DetectionWorker(threading.Thread):
+    """
+    Long-lived detection thread fed from a FrameRing
+
+    Pins the newest frame only while converting it to RGB (into a reused
+    buffer), then runs Gemini off the capture path and publishes an immutable
+    snapshot of the results.
+    """
+
+    def __init__(self, ring, pipeline, width, height):
+        super().__init__(name="detection", daemon=True)
+        self.ring = ring
+        self.pipeline = pipeline
+        self.width = width
+        self.height = height
+        self.auto_detect = True
+        # Detect on scene change, at most every 0.5s and at least every 5s
+        self.scheduler = SceneChangeScheduler(change_threshold=12.0, min_interval=0.5, max_staleness=5.0)
+
+        self.rgb_buffer = np.empty((height, width, 3), dtype=np.uint8)
+        self.snapshot = ()       # tuple of Detection, swapped atomically
+        self.is_processing = False
+        self._last_seq = 0
+        self._trigger = threading.Event()
+        self._stop_event = threading.Event()
+
+    def trigger(self):
+        """Request a detection on the next frame."""
+        self._trigger.set()
+
+    def clear(self):
+        self.snapshot = ()
+
+    def stop(self):
+        self._stop_event.set()
+        self._trigger.set()
+
+    def run(self):
+        while not self._stop_event.is_set() and not self.ring.closed:
+            forced = self._trigger.is_set()
+            if not forced and not self.auto_detect:
+                self._trigger.wait(0.05)
+                continue
+
+            lease = self.ring.wait_latest(self._last_seq, timeout=0.05)
+            if lease is None:
+                continue
+            index, seq, _ = lease
+            try:
+                self._last_seq = seq
+                if not self.scheduler.should_detect(self.ring.frames[index], force=forced):
+                    continue
+                self._trigger.clear()
+                # Convert BGR to RGB for Gemini API (into the reused buffer)
+                cv2.cvtColor(self.ring.frames[index], cv2.COLOR_BGR2RGB, dst=self.rgb_buffer)
+            finally:
+                self.ring.release(index)
+
+            self.is_processing = True
+            try:
+                self.snapshot = detect_frame(self.pipeline, Image.fromarray(self.rgb_buffer))
+            except Exception as e:
+                print(f"Error processing frame: {e}")
+            finally:
+                self.is_processing = False
+
+
+def draw_detections(display_frame, detections):
+    """Draw bounding boxes and distance labels onto display_frame in place"""
+    height, width = display_frame.shape[:2]
+    for det in detections:
+        x1, y1, x2, y2 = det.pixel_box(width, height)
+        label = det.label
+        distance = det.distance_m
+
+        # Choose color based on whether distance is known
+        color = (0, 255, 0) if distance else (255, 165, 0)
+
+        # Draw rectangle
+        cv2.rectangle(display_frame, (x1, y1), (x2, y2), color, 2)
+
+        # Prepare label text
+        if distance:
+            label_text = f"{label} ({distance}m)"
+        else:
+            label_text = f"{label}"
+
+        # Draw label background
+        label_size, _ = cv2.getTextSize(label_text, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2)
+        cv2.rectangle(display_frame, (x1, y1 - label_size[1] - 10),
+                     (x1 + label_size[0] + 10, y1), color, -1)
+
+        # Draw label text
+        cv2.putText(display_frame, label_text, (x1 + 5, y1 - 5),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 0), 2)
+
+
+def detection_record(seq, stream_time, detections, latency, width, height):
+    """One JSON-lines record for headless output (coords in pixels)"""
+    return {
+        "frame": seq,
+        "time_s": round(stream_time, 3),
+        "latency_s": round(latency, 3),
+        "detections": [
+            {"label": det.label, "coords": list(det.pixel_box(width, height)), "distance_m": det.distance_m}
+            for det in detections
+        ]
+    }
+
+
+def run_headless(pipeline, source, rate, out_path, video_out=None):
+    """
+    Process a video file or stream without a window
 
-client = genai.Client(api_key=api_key)
-prompt = "Detect all of the prominent items in the image. The box_2d should be [ymin, xmin, ymax, xmax] normalized to 0-1000."
+    Frames are decoded by a background CaptureThread; detection runs on at
+    most `rate` frames per second of stream time and each result is written
+    as one JSON line. Files are read losslessly so runs are reproducible;
+    live streams drop frames while a detection is in flight.
 
-# Try to find a working model
-MODELS_TO_TRY = ["gemini-1.5-flash", "gemini-1.5-pro", "gemini-2.0-flash-exp"]
-ACTIVE_MODEL = None
+    Args:
+        pipeline: DetectionPipeline (see build_pipeline)
+        source: Video file path or stream URL (rtsp://, http://, ...)
+        rate: Target detections per second of video
+        out_path: JSON-lines output path
+        video_out: Optional path for an annotated copy of the video
+    """
+    capture = cv2.VideoCapture(source)
+    if not capture.isOpened():
+        raise Exception(f"Could not open video source: {source}")
 
-print("Testing available models...")
-for model in MODELS_TO_TRY:
+    is_file = os.path.isfile(source)
+    ret, first_frame = capture.read()
+    if not ret:
+        raise Exception(f"Could not read a frame from: {source}")
+    if is_file:
+        # Rewind so the first frame is processed like the others
+        capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+
+    height, width = first_frame.shape[:2]
+    fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+
+    ring = FrameRing(first_frame.shape, size=8, lossless=is_file)
+    capture_thread = CaptureThread(capture, ring)
+    rgb_buffer = np.empty((height, width, 3), dtype=np.uint8)
+    display_frame = np.empty_like(first_frame)
+
+    writer = None
+    if video_out:
+        writer = cv2.VideoWriter(video_out, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+
+    print(f"Headless detection on {source} ({width}x{height} @ {fps:.1f}fps, {rate} detections/s)")
+
+    detect_interval = 1.0 / rate
+    next_detect_time = 0.0
+    snapshot = ()
+    seq = 0
+    detections_run = 0
+    total_latency = 0.0
+    start = time.time()
+
+    capture_thread.start()
     try:
-        test_response = client.models.generate_content(
-            model=model,
-            contents="test"
-        )
-        ACTIVE_MODEL = model
-        print(f"Using model: {ACTIVE_MODEL}")
-        break
-    except Exception as e:
-        print(f"{model} not available")
-
-if not ACTIVE_MODEL:
-    raise ValueError("No working Gemini model found. Check your API key.")
-
-
-# Known object dimensions (real-world measurements in cm)
-KNOWN_OBJECTS = {
-    "person": {"width_cm": 50, "height_cm": 170},
-    "laptop": {"width_cm": 35, "height_cm": 25},
-    "phone": {"width_cm": 7, "height_cm": 15},
-    "bottle": {"width_cm": 7, "height_cm": 20},
-    "cup": {"width_cm": 8, "height_cm": 10},
-    "book": {"width_cm": 15, "height_cm": 20},
-    "chair": {"width_cm": 45, "height_cm": 90},
-    "monitor": {"width_cm": 50, "height_cm": 30},
-}
-
-FOCAL_LENGTH = 350  # Default value, needs calibration
-
-
-def distance_to_camera(knownWidth, focalLength, perWidth):
-    if perWidth == 0:
-        return None
-    return (knownWidth * focalLength) / perWidth
-
-
-def estimate_object_distance(box, label):
-    object_info = KNOWN_OBJECTS.get(label.lower())
-    
-    if not object_info:
-        return None
-    
-    box_width = box['x2'] - box['x1']
-    box_height = box['y2'] - box['y1']
-    known_height = object_info['height_cm']
-    distance = distance_to_camera(known_height, FOCAL_LENGTH, box_height)
-    
-    return distance
-
-
-# Thread-safe variables
-detection_lock = threading.Lock()
-last_detections = []
-is_processing = False
-processing_thread = None
-
-
-def process_frame_async(frame, width, height):
-    """Process frame in background thread"""
-    global last_detections, is_processing
-    
+        with open(out_path, "w") as out:
+            while True:
+                if is_file:
+                    lease = ring.wait_next(seq, timeout=5.0)
+                else:
+                    lease = ring.wait_latest(seq, timeout=5.0)
+                if lease is None:
+                    break
+                index, seq, timestamp = lease
+
+                # Files use video time so results don't depend on machine speed
+                stream_time = (seq - 1) / fps if is_file else timestamp - start
+
+                try:
+                    run_detection = stream_time >= next_detect_time
+                    if run_detection:
+                        cv2.cvtColor(ring.frames[index], cv2.COLOR_BGR2RGB, dst=rgb_buffer)
+                    if writer is not None:
+                        np.copyto(display_frame, ring.frames[index])
+                finally:
+                    ring.release(index)
+
+                if run_detection:
+                    next_detect_time = stream_time + detect_interval
+                    api_start = time.time()
+                    try:
+                        snapshot = detect_frame(pipeline, Image.fromarray(rgb_buffer))
+                        latency = time.time() - api_start
+                        detections_run += 1
+                        total_latency += latency
+                        out.write(json.dumps(detection_record(seq, stream_time, snapshot, latency, width, height)) + "\n")
+                        out.flush()
+                    except Exception as e:
+                        print(f"Error processing frame {seq}: {e}")
+
+                if writer is not None:
+                    draw_detections(display_frame, snapshot)
+                    writer.write(display_frame)
+    except KeyboardInterrupt:
+        print("\nInterrupted by user")
+    finally:
+        capture_thread.stop()
+        capture_thread.join(timeout=1.0)
+        capture.release()
+        if writer is not None:
+            writer.release()
+
+    elapsed = time.time() - start
+    avg_latency = total_latency / detections_run if detections_run else 0.0
+    print(f"Processed {seq} frames in {elapsed:.1f}s ({seq / elapsed if elapsed else 0:.1f}fps), "
+          f"{detections_run} detections, avg latency {avg_latency:.2f}s -> {out_path}")
+
+
+def main(pipeline):
+    # Open webcam
+    capture = cv2.VideoCapture(0)
+
+    if not capture.isOpened():
+        raise Exception("Could not open webcam. Make sure your camera is connected.")
+
+    # Set camera resolution
+    capture.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
+    capture.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+
+    # The first frame fixes the ring's frame shape
+    ret, first_frame = capture.read()
+    if not ret:
+        raise Exception("Failed to grab frame")
+    height, width = first_frame.shape[:2]
+
+    ring = FrameRing(first_frame.shape, size=4)
+    capture_thread = CaptureThread(capture, ring)
+    worker = DetectionWorker(ring, pipeline, width, height)
+    display_frame = np.empty_like(first_frame)
+
+    print("\nStarting video detection with distance estimation...")
+    print("Press 'q' to quit")
+    print("Press 's' to process current frame")
+    print("Press 'a' to toggle auto-detection mode")
+    print("Press 'c' to clear detections")
+
+    capture_thread.start()
+    worker.start()
+    rendered_seq = 0
+
     try:
-        # Convert BGR to RGB for Gemini API
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        pil_image = Image.fromarray(rgb_frame)
-        
-        # Call Gemini API for object detection
-        print(f"Processing frame in background...")
-        response = client.models.generate_content(
-            model=ACTIVE_MODEL,
-            contents=[pil_image, prompt],
-            config=types.GenerateContentConfig(response_mime_type="application/json")
-        )
-        
-        # Parse bounding boxes
-        bounding_boxes = json.loads(response.text)
-        
-        # Convert normalized coordinates to absolute and estimate distance
-        new_detections = []
-        for bbox in bounding_boxes:
-            abs_y1 = int(bbox["box_2d"][0]/1000 * height)
-            abs_x1 = int(bbox["box_2d"][1]/1000 * width)
-            abs_y2 = int(bbox["box_2d"][2]/1000 * height)
-            abs_x2 = int(bbox["box_2d"][3]/1000 * width)
-            
-            label = bbox.get("label", "object")
-            box = {
-                "x1": abs_x1,
-                "y1": abs_y1,
-                "x2": abs_x2,
-                "y2": abs_y2
-            }
-            
-            # Estimate distance
-            distance_cm = estimate_object_distance(box, label)
-            
-            detection = {
-                "coords": [abs_x1, abs_y1, abs_x2, abs_y2],
-                "label": label,
-                "distance_cm": distance_cm,
-                "distance_m": round(distance_cm / 100, 2) if distance_cm else None
-            }
-            
-            new_detections.append(detection)
-        
-        # Update detections thread-safely
-        with detection_lock:
-            last_detections = new_detections
-        
-        print(f"Detected {len(new_detections)} objects:")
-        for det in new_detections:
-            if det['distance_m']:
-                print(f"  - {det['label']}: {det['distance_m']}m")
+        while True:
+            lease = ring.wait_latest(rendered_seq, timeout=0.05)
+            if lease is None:
+                if ring.closed:
+                    print("Failed to grab frame")
+                    break
             else:
-                print(f"  - {det['label']}: (distance unknown)")
-        
-    except Exception as e:
-        print(f"Error processing frame: {e}")
-    finally:
-        with detection_lock:
-            is_processing = False
-
-
-# Open webcam
-capture = cv2.VideoCapture(0)
-
-if not capture.isOpened():
-    raise Exception("Could not open webcam. Make sure your camera is connected.")
-
-# Set camera resolution
-capture.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-capture.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-
-print("\nStarting video detection with distance estimation...")
-print("Press 'q' to quit")
-print("Press 's' to process current frame")
-print("Press 'a' to toggle auto-detection mode")
-print("Press 'c' to clear detections")
-
-frame_count = 0
-auto_detect = True
-process_every_n_frames = 40  # Process every 40 frames (~2 seconds at 20fps)
-
-try:
-    while True:
-        ret, frame = capture.read()
-        
-        if not ret:
-            print("Failed to grab frame")
-            break
-        
-        frame_count += 1
-        display_frame = frame.copy()
-        
-        # Get frame dimensions
-        height, width = frame.shape[:2]
-        
-        # Auto-detection mode
-        should_process = False
-        if auto_detect and frame_count % process_every_n_frames == 0:
-            should_process = True
-        
-        # Handle key presses
-        key = cv2.waitKey(1) & 0xFF
-        if key == ord('q'):
-            break
-        elif key == ord('s'):
-            should_process = True
-            print("Manual detection triggered...")
-        elif key == ord('a'):
-            auto_detect = not auto_detect
-            print(f"Auto-detection: {'ON' if auto_detect else 'OFF'}")
-        elif key == ord('c'):
-            with detection_lock:
-                last_detections = []
-            print("Detections cleared")
-        
-        # Start processing in background thread if needed
-        if should_process:
-            with detection_lock:
-                if not is_processing:
-                    is_processing = True
-                    processing_thread = threading.Thread(
-                        target=process_frame_async, 
-                        args=(frame.copy(), width, height),
-                        daemon=True
-                    )
-                    processing_thread.start()
-        
-        # Draw bounding boxes and distance on display frame (thread-safe)
-        with detection_lock:
-            current_detections = last_detections.copy()
-            processing_status = is_processing
-        
-        for det in current_detections:
-            x1, y1, x2, y2 = det["coords"]
-            label = det["label"]
-            distance = det["distance_m"]
-            
-            # Choose color based on whether distance is known
-            color = (0, 255, 0) if distance else (255, 165, 0)
-            
-            # Draw rectangle
-            cv2.rectangle(display_frame, (x1, y1), (x2, y2), color, 2)
-            
-            # Prepare label text
-            if distance:
-                label_text = f"{label} ({distance}m)"
+                index, rendered_seq, _ = lease
+                np.copyto(display_frame, ring.frames[index])
+                ring.release(index)
+
+            # Handle key presses
+            key = cv2.waitKey(1) & 0xFF
+            if key == ord('q'):
+                break
+            elif key == ord('s'):
+                worker.trigger()
+                print("Manual detection triggered...")
+            elif key == ord('a'):
+                worker.auto_detect = not worker.auto_detect
+                print(f"Auto-detection: {'ON' if worker.auto_detect else 'OFF'}")
+            elif key == ord('c'):
+                worker.clear()
+                print("Detections cleared")
+
+            if lease is None:
+                continue
+
+            # Draw from an immutable snapshot; the worker swaps in a new tuple
+            current_detections = worker.snapshot
+            draw_detections(display_frame, current_detections)
+
+            # Display status bar
+            status_text = (f"Auto: {'ON' if worker.auto_detect else 'OFF'} | Frame: {rendered_seq} "
+                           f"| Capture: {capture_thread.fps:.0f}fps | Objects: {len(current_detections)}")
+            if worker.is_processing:
+                status_text += " | PROCESSING..."
             else:
-                label_text = f"{label}"
-            
-            # Draw label background
-            label_size, _ = cv2.getTextSize(label_text, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2)
-            cv2.rectangle(display_frame, (x1, y1 - label_size[1] - 10), 
-                         (x1 + label_size[0] + 10, y1), color, -1)
-            
-            # Draw label text
-            cv2.putText(display_frame, label_text, (x1 + 5, y1 - 5), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 0), 2)
-        
-        # Display status bar
-        status_text = f"Auto: {'ON' if auto_detect else 'OFF'} | Frame: {frame_count} | Objects: {len(current_detections)}"
-        if processing_status:
-            status_text += " | PROCESSING..."
-        cv2.putText(display_frame, status_text, (10, 30), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
-        
-        # Show frame
-        cv2.imshow('Object Detection + Distance', display_frame)
-
-except KeyboardInterrupt:
-    print("\nInterrupted by user")
-finally:
-    # Cleanup
-    capture.release()
-    cv2.destroyAllWindows()
-    print("Detection stopped.")
\ No newline at end of file
+                status_text += f" | Change: {worker.scheduler.last_score:.1f}"
+            cv2.putText(display_frame, status_text, (10, 30),
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+
+            # Show frame
+            cv2.imshow('Object Detection + Distance', display_frame)
+
+    except KeyboardInterrupt:
+        print("\nInterrupted by user")
+    finally:
+        # Cleanup
+        worker.stop()
+        capture_thread.stop()
+        capture_thread.join(timeout=1.0)
+        capture.release()
+        cv2.destroyAllWindows()
+        print("Detection stopped.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Webcam / video object detection with distance estimation")
+    parser.add_argument("--source", help="Video file or stream URL; runs headless instead of opening the webcam")
+    parser.add_argument("--rate", type=float, default=1.0, help="Headless: detections per second of video")
+    parser.add_argument("--out", default="detections.jsonl", help="Headless: JSON-lines output path")
+    parser.add_argument("--video-out", help="Headless: write an annotated copy of the video here")
+    args = parser.parse_args()
+
+    pipeline = build_pipeline()
+    if args.source:
+        run_headless(pipeline, args.source, args.rate, args.out, args.video_out)
+    else:
+        main(pipeline)
@@ -0,0 +1,39 @@
+"""
+Shared detection pipeline for the web server, webcam loop and batch tools
+
+Importing this package has no side effects: no API clients are created and
+no models are probed until a caller asks for it.
+"""
+
+from .distance import (
+    DEFAULT_FOCAL_LENGTH,
+    distance_to_camera,
+    estimate_distance_m,
+    estimate_object_distance,
+)
+from .models import MODELS_TO_TRY, SingleModelClient, json_config, probe_models
+from .objects import DEFAULT_TABLE, KNOWN_OBJECTS, ObjectSizeTable
+from .pipeline import DETECT_PROMPT, DetectionPipeline
+from .records import Detection, box_2d_to_normalized
+from .response_parser import ResponseParseError, parse_json, parse_json_list
+
+__all__ = [
+    "DEFAULT_FOCAL_LENGTH",
+    "DEFAULT_TABLE",
+    "DETECT_PROMPT",
+    "Detection",
+    "DetectionPipeline",
+    "KNOWN_OBJECTS",
+    "MODELS_TO_TRY",
+    "ObjectSizeTable",
+    "ResponseParseError",
+    "SingleModelClient",
+    "box_2d_to_normalized",
+    "distance_to_camera",
+    "estimate_distance_m",
+    "estimate_object_distance",
+    "json_config",
+    "parse_json",
+    "parse_json_list",
+    "probe_models",
+]
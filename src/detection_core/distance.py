@@ -0,0 +1,50 @@
+from .objects import DEFAULT_TABLE
+
+# Calibrated for the phone frames the web app receives (original resolution)
+DEFAULT_FOCAL_LENGTH = 800
+
+# Estimates outside this range (meters) are treated as unknown
+MIN_DISTANCE_M = 0.1
+MAX_DISTANCE_M = 100.0
+
+
+def distance_to_camera(known_size, focal_length, pixel_size):
+    """Similar-triangles distance, in the units of known_size (None for empty boxes)"""
+    if pixel_size == 0:
+        return None
+    return (known_size * focal_length) / pixel_size
+
+
+def estimate_distance_m(label, norm_height, image_height, focal_length=DEFAULT_FOCAL_LENGTH,
+                        table=DEFAULT_TABLE):
+    """
+    Distance to an object of a known kind from its box height
+
+    Args:
+        label: Detected label, matched against the size table
+        norm_height: Box height as a fraction of the frame (0-1)
+        image_height: Frame height in pixels the focal length is calibrated for
+        focal_length: Camera focal length in pixels
+        table: ObjectSizeTable to look the label up in
+
+    Returns:
+        Distance in meters (2 decimals), or None if unknown or implausible
+    """
+    height_cm = table.height_cm(label)
+    if height_cm is None:
+        return None
+
+    pixel_height = norm_height * image_height
+    if pixel_height <= 0:
+        return None
+
+    distance_m = round(height_cm * focal_length / pixel_height / 100, 2)
+    if distance_m < MIN_DISTANCE_M or distance_m > MAX_DISTANCE_M:
+        return None
+    return distance_m
+
+
+def estimate_object_distance(norm_box, label, image_height, focal_length=DEFAULT_FOCAL_LENGTH,
+                             table=DEFAULT_TABLE):
+    """estimate_distance_m for a normalized {'x','y','width','height'} box"""
+    return estimate_distance_m(label, norm_box['height'], image_height, focal_length, table)
@@ -0,0 +1,65 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Preference order shared by the scripts; the web app may override it
+MODELS_TO_TRY = ["gemini-2.0-flash-exp", "gemini-1.5-flash", "gemini-1.5-pro"]
+
+
+def probe_models(client, models=MODELS_TO_TRY, on_unavailable=None):
+    """
+    Find the first model the API key can use
+
+    Args:
+        client: genai.Client
+        models: Model names in order of preference
+        on_unavailable: Called as on_unavailable(model, error) for each model
+            that fails; when given, every model is checked instead of
+            stopping at the first working one
+
+    Returns:
+        The first working model name, or None
+    """
+    working = None
+    for model in models:
+        try:
+            client.models.generate_content(model=model, contents="test")
+        except Exception as e:
+            logger.warning(f"{model} not available: {e}")
+            if on_unavailable is not None:
+                on_unavailable(model, e)
+            continue
+        if working is None:
+            logger.info(f"Using model: {model}")
+            working = model
+            if on_unavailable is None:
+                break
+        else:
+            logger.info(f"Model available: {model}")
+    return working
+
+
+def json_config():
+    """GenerateContentConfig asking for a JSON response"""
+    from google.genai import types
+
+    return types.GenerateContentConfig(response_mime_type="application/json")
+
+
+class SingleModelClient:
+    """
+    Pins a genai.Client to one model behind the generate_content(contents,
+    config) interface of ResilientModelClient, for scripts that don't need
+    failover
+    """
+
+    def __init__(self, client, model):
+        self.client = client
+        self.model = model
+
+    @property
+    def active_model(self):
+        return self.model
+
+    def generate_content(self, contents, config=None):
+        return self.client.models.generate_content(model=self.model, contents=contents, config=config)
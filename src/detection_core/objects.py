@@ -0,0 +1,49 @@
+# Real-world object sizes used for monocular distance estimates (cm)
+KNOWN_OBJECTS = {
+    "person": {"width_cm": 50, "height_cm": 170},
+    "laptop": {"width_cm": 35, "height_cm": 25},
+    "phone": {"width_cm": 7, "height_cm": 15},
+    "bottle": {"width_cm": 7, "height_cm": 20},
+    "cup": {"width_cm": 8, "height_cm": 10},
+    "book": {"width_cm": 15, "height_cm": 20},
+    "chair": {"width_cm": 45, "height_cm": 90},
+    "monitor": {"width_cm": 50, "height_cm": 30},
+    "keyboard": {"width_cm": 45, "height_cm": 15},
+    "mouse": {"width_cm": 6, "height_cm": 10},
+}
+
+
+class ObjectSizeTable:
+    """
+    Label -> known height lookup with fuzzy matching
+
+    Exact labels are a single dict hit. Free-form model labels ("office
+    chair") fall back to a substring match against the known objects, and
+    the answer (including "unknown") is memoized so each distinct label is
+    only resolved once.
+    """
+
+    def __init__(self, objects=KNOWN_OBJECTS, max_memo=4096):
+        self._heights = {label.lower(): dims["height_cm"] for label, dims in objects.items()}
+        self._resolved = dict(self._heights)
+        self._max_memo = max_memo
+
+    def height_cm(self, label):
+        """Known height for a label, or None if it matches no known object"""
+        key = label.lower()
+        try:
+            return self._resolved[key]
+        except KeyError:
+            pass
+
+        height = None
+        for known, known_height in self._heights.items():
+            if known in key or key in known:
+                height = known_height
+                break
+        if len(self._resolved) < self._max_memo:
+            self._resolved[key] = height
+        return height
+
+
+DEFAULT_TABLE = ObjectSizeTable()
@@ -0,0 +1,78 @@
+import logging
+
+from .distance import DEFAULT_FOCAL_LENGTH, estimate_distance_m
+from .objects import DEFAULT_TABLE
+from .records import Detection, box_2d_to_normalized
+from .response_parser import parse_json_list
+
+logger = logging.getLogger(__name__)
+
+DETECT_PROMPT = ("Detect all of the prominent items in the image. "
+                 "The box_2d should be [ymin, xmin, ymax, xmax] normalized to 0-1000.")
+
+
+class DetectionPipeline:
+    """
+    Model call -> parsed boxes -> Detection records with distances
+
+    Shared by the web server, the webcam/video loop and the batch tools. The
+    conversion step resolves labels through the memoized size table and
+    builds one slotted record per box.
+    """
+
+    def __init__(self, model_client, config=None, prompt=DETECT_PROMPT,
+                 focal_length=DEFAULT_FOCAL_LENGTH, table=DEFAULT_TABLE):
+        """
+        Args:
+            model_client: Anything with generate_content(contents, config) returning
+                a response with .text (ResilientModelClient, SingleModelClient, stubs)
+            config: GenerateContentConfig for the call (see models.json_config)
+            prompt: Detection prompt sent after the image
+            focal_length: Camera focal length in pixels at the image height
+                passed to convert()
+            table: ObjectSizeTable for distance estimates
+        """
+        self.model_client = model_client
+        self.config = config
+        self.prompt = prompt
+        self.focal_length = focal_length
+        self.table = table
+
+    def detect(self, pil_image):
+        """Raw model boxes for one image (list of dicts with box_2d and label)"""
+        response = self.model_client.generate_content(contents=[pil_image, self.prompt], config=self.config)
+        return parse_json_list(response.text)
+
+    def convert(self, bounding_boxes, image_height):
+        """
+        Args:
+            bounding_boxes: Parsed model output
+            image_height: Frame height in pixels the focal length applies to
+
+        Returns:
+            List of Detection, malformed boxes skipped
+        """
+        focal_length = self.focal_length
+        table = self.table
+        detections = []
+        for bbox in bounding_boxes:
+            try:
+                x, y, width, height = box_2d_to_normalized(bbox["box_2d"])
+                label = bbox.get("label", "object")
+                distance_m = estimate_distance_m(label, height, image_height, focal_length, table)
+            except (KeyError, IndexError, ValueError, TypeError, AttributeError) as e:
+                logger.warning(f"Skipping malformed bbox: {e}")
+                continue
+
+            detections.append(Detection(x, y, width, height, label, bbox.get("confidence", 0.9), distance_m))
+        return detections
+
+    def run(self, pil_image, image_height=None):
+        """
+        detect() + convert() for one image
+
+        Args:
+            image_height: Height the focal length is calibrated for; defaults to
+                the image's own height
+        """
+        return self.convert(self.detect(pil_image), image_height or pil_image.size[1])
@@ -0,0 +1,48 @@
+class Detection:
+    """
+    One detected object in normalized frame coordinates (0-1)
+
+    Slotted so a frame's worth of records costs a few small objects rather
+    than a dict each; to_dict() produces the wire format of detection_result.
+    """
+
+    __slots__ = ("x", "y", "width", "height", "label", "confidence", "distance_m")
+
+    def __init__(self, x, y, width, height, label, confidence=0.9, distance_m=None):
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.label = label
+        self.confidence = confidence
+        self.distance_m = distance_m
+
+    def __repr__(self):
+        return (f"Detection({self.label!r}, x={self.x:.3f}, y={self.y:.3f}, w={self.width:.3f}, "
+                f"h={self.height:.3f}, distance_m={self.distance_m})")
+
+    def pixel_box(self, frame_width, frame_height):
+        """(x1, y1, x2, y2) in pixels for drawing"""
+        return (
+            int(self.x * frame_width),
+            int(self.y * frame_height),
+            int((self.x + self.width) * frame_width),
+            int((self.y + self.height) * frame_height),
+        )
+
+    def to_dict(self):
+        return {
+            'x': self.x,
+            'y': self.y,
+            'width': self.width,
+            'height': self.height,
+            'label': self.label,
+            'confidence': self.confidence,
+            'distance_m': self.distance_m,
+        }
+
+
+def box_2d_to_normalized(box_2d):
+    """Model box [ymin, xmin, ymax, xmax] in 0-1000 -> (x, y, width, height) in 0-1"""
+    ymin, xmin, ymax, xmax = box_2d[0], box_2d[1], box_2d[2], box_2d[3]
+    return xmin / 1000.0, ymin / 1000.0, (xmax - xmin) / 1000.0, (ymax - ymin) / 1000.0
@@ -0,0 +1,199 @@
+import json
+import re
+
+# Shared decoder; raw_decode lets us parse from an offset without slicing the
+# response into new strings.
+_decoder = json.JSONDecoder()
+
+# Whitespace and item separators between array elements
+_SEPARATORS = re.compile(r'[\s,]*')
+_LEADING_WS = re.compile(r'\s*')
+# Info string of a fence opened and closed on one line ("```json [...]```")
+_INFO_STRING = re.compile(r'[A-Za-z0-9_+-]*')
+
+_FENCE = "```"
+
+
+class ResponseParseError(ValueError):
+    """Raised when no JSON value can be recovered from a model response."""
+
+
+def _fence_bounds(text):
+    """
+    Locate the body of a markdown code fence
+
+    Returns:
+        (start, end) offsets of the fenced body, or (0, len(text)) if the
+        response is not fenced. A missing closing fence (truncated response)
+        extends the body to the end of the text.
+    """
+    open_at = text.find(_FENCE)
+    if open_at == -1:
+        return 0, len(text)
+
+    after_fence = open_at + len(_FENCE)
+    close_at = text.find(_FENCE, after_fence)
+    if close_at == -1:
+        close_at = len(text)
+
+    # Skip the info string ("json", "JSON", ...) up to the end of the line, or
+    # just the word itself when the whole fence is on one line
+    newline = text.find("\n", after_fence, close_at)
+    if newline != -1:
+        body_start = newline + 1
+    else:
+        body_start = _INFO_STRING.match(text, after_fence).end()
+    return body_start, close_at
+
+
+def _next_value_start(text, pos, end):
+    """Return the offset of the next '[' or '{' in text[pos:end], or -1."""
+    bracket = text.find("[", pos, end)
+    brace = text.find("{", pos, end)
+    if bracket == -1:
+        return brace
+    if brace == -1:
+        return bracket
+    return min(bracket, brace)
+
+
+def _container_end(text, pos, end):
+    """
+    Offset just past the bracket that closes the container opened at pos
+
+    Strings are skipped so brackets inside them don't count. Returns -1 if
+    the container is still open at `end` (a truncated response).
+    """
+    depth = 0
+    i = pos
+    while i < end:
+        char = text[i]
+        if char == '"':
+            i += 1
+            while i < end and text[i] != '"':
+                i += 2 if text[i] == "\\" else 1
+        elif char in "[{":
+            depth += 1
+        elif char in "]}":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    return -1
+
+
+def _recover_array(text, pos, end):
+    """
+    Decode the complete items of a (possibly truncated) JSON array
+
+    Args:
+        text: Full response text
+        pos: Offset of the opening '['
+        end: Offset past which items are not considered
+
+    Returns:
+        List of every item that decoded cleanly before the first broken one
+    """
+    items = []
+    i = _SEPARATORS.match(text, pos + 1).end()
+    while i < end and text[i] != "]":
+        try:
+            item, i = _decoder.raw_decode(text, i)
+        except json.JSONDecodeError:
+            break
+        if i > end:
+            break
+        items.append(item)
+        i = _SEPARATORS.match(text, i).end()
+    return items
+
+
+def _is_structured(value):
+    """True for objects and for non-empty arrays of objects/arrays."""
+    if isinstance(value, dict):
+        return True
+    return bool(value) and isinstance(value[0], (dict, list))
+
+
+def parse_json(text):
+    """
+    Extract the first JSON value from a model response
+
+    Handles bare JSON, markdown ```json fences, leading prose and arrays cut
+    off mid-item (the complete items are kept). Only values at the outermost
+    level are returned; a box_2d list inside a truncated item never is. The
+    text is scanned once by offset; nothing is split or re-joined.
+
+    Args:
+        text: Raw response text from the model
+
+    Returns:
+        The decoded JSON value (usually a list of detections)
+
+    Raises:
+        ResponseParseError: If no JSON value can be recovered
+    """
+    if not text:
+        raise ResponseParseError("Empty model response")
+
+    start, end = _fence_bounds(text)
+
+    # Fast path: response_mime_type="application/json" gives us bare JSON
+    first = _LEADING_WS.match(text, start).end()
+    pos = first
+    if pos >= end or text[pos] not in "[{":
+        pos = _next_value_start(text, pos, end)
+
+    # Values found inside prose ("see [1]") are only used if nothing better turns up
+    fallback = None
+
+    while pos != -1:
+        try:
+            value, value_end = _decoder.raw_decode(text, pos)
+            if value_end <= end:
+                if pos == first or _is_structured(value):
+                    return value
+                if fallback is None:
+                    fallback = value
+                pos = _next_value_start(text, value_end, end)
+                continue
+        except json.JSONDecodeError:
+            pass
+
+        if text[pos] == "[":
+            items = _recover_array(text, pos, end)
+            if items and (pos == first or _is_structured(items)):
+                return items
+
+        # Anything before the matching close bracket is nested in this value
+        close = _container_end(text, pos, end)
+        if close == -1:
+            # Cut off before its first complete item; a prose fallback is not the answer
+            raise ResponseParseError("Model response truncated before any complete item")
+        pos = _next_value_start(text, close, end)
+
+    if fallback is not None:
+        return fallback
+    raise ResponseParseError("No JSON found in model response")
+
+
+def parse_json_list(text):
+    """
+    Like parse_json, but always returns a list of items
+
+    A lone object is wrapped in a list, and an object whose only list value
+    holds the items (e.g. {"detections": [...]}) is unwrapped. A lone
+    detection ({"box_2d": [...], "label": ...}) is an item itself, so its
+    box_2d list is never mistaken for the items.
+    """
+    value = parse_json(text)
+    if isinstance(value, list):
+        return value
+    if isinstance(value, dict):
+        if "box_2d" in value or "label" in value:
+            return [value]
+        lists = [v for v in value.values() if isinstance(v, list)]
+        if len(lists) == 1 and all(isinstance(item, dict) for item in lists[0]):
+            return lists[0]
+        return [value]
+    raise ResponseParseError(f"Expected a JSON list, got {type(value).__name__}")
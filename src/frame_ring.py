@@ -0,0 +1,202 @@
+import threading
+import time
+
+import numpy as np
+
+
+class FrameRing:
+    """
+    Fixed pool of preallocated frames shared between a capture thread and readers
+
+    The writer fills the oldest slot nobody is reading; readers pin the slot they
+    are using so it is never overwritten underneath them. Frames are never copied
+    or reallocated by the ring itself.
+    """
+
+    def __init__(self, shape, size=4, dtype=np.uint8, lossless=False):
+        """
+        Args:
+            shape: Shape of one frame, e.g. (480, 640, 3)
+            size: Number of slots (at least 3: one being written, one latest, one pinned)
+            dtype: Frame dtype
+            lossless: If True the writer waits for the reader instead of dropping
+                      frames (for file sources that must be processed in full)
+        """
+        if size < 3:
+            raise ValueError("FrameRing needs at least 3 slots")
+
+        self.frames = np.empty((size,) + tuple(shape), dtype=dtype)
+        self.size = size
+        self.lossless = lossless
+
+        self._seqs = [0] * size          # 0 = empty, -1 = being written
+        self._timestamps = [0.0] * size
+        self._pins = [0] * size
+        self._latest_seq = 0
+        self._latest_index = -1
+        self._consumed_seq = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    @property
+    def latest_seq(self):
+        return self._latest_seq
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def close(self):
+        """Wake every waiter; readers get None once the remaining frames are drained."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def acquire_write(self):
+        """
+        Reserve a slot for the writer
+
+        Returns:
+            Slot index, or None if the ring was closed
+        """
+        with self._cond:
+            while not self._closed:
+                index = self._free_slot()
+                if index is not None:
+                    self._seqs[index] = -1
+                    return index
+                self._cond.wait()
+            return None
+
+    def commit(self, index, timestamp=None):
+        """Publish a slot filled by the writer as the newest frame."""
+        with self._cond:
+            self._latest_seq += 1
+            self._seqs[index] = self._latest_seq
+            self._timestamps[index] = time.time() if timestamp is None else timestamp
+            self._latest_index = index
+            self._cond.notify_all()
+
+    def abort(self, index):
+        """Give back a reserved slot without publishing it."""
+        with self._cond:
+            self._seqs[index] = 0
+            self._cond.notify_all()
+
+    def wait_latest(self, after_seq=0, timeout=None):
+        """
+        Pin the newest frame once it is newer than after_seq
+
+        Returns:
+            (index, seq, timestamp), or None on timeout / close. The frame is
+            self.frames[index] and must be handed back with release().
+        """
+        with self._cond:
+            if not self._cond.wait_for(
+                lambda: self._latest_seq > after_seq or self._closed, timeout
+            ):
+                return None
+            if self._latest_seq <= after_seq:
+                return None
+            index = self._latest_index
+            self._pins[index] += 1
+            return index, self._seqs[index], self._timestamps[index]
+
+    def wait_next(self, after_seq=0, timeout=None):
+        """
+        Pin the oldest frame newer than after_seq (lossless consumers)
+
+        Returns:
+            (index, seq, timestamp), or None on timeout / once closed and drained
+        """
+        with self._cond:
+            found = None
+
+            def ready():
+                nonlocal found
+                found = self._oldest_after(after_seq)
+                return found is not None or self._closed
+
+            if not self._cond.wait_for(ready, timeout) or found is None:
+                return None
+            self._pins[found] += 1
+            self._consumed_seq = max(self._consumed_seq, self._seqs[found])
+            return found, self._seqs[found], self._timestamps[found]
+
+    def release(self, index):
+        """Unpin a slot returned by wait_latest() / wait_next()."""
+        with self._cond:
+            self._pins[index] -= 1
+            self._cond.notify_all()
+
+    def _oldest_after(self, after_seq):
+        best = None
+        for i in range(self.size):
+            seq = self._seqs[i]
+            if seq > after_seq and (best is None or seq < self._seqs[best]):
+                best = i
+        return best
+
+    def _free_slot(self):
+        best = None
+        for i in range(self.size):
+            seq = self._seqs[i]
+            if self._pins[i] or seq == -1 or i == self._latest_index:
+                continue
+            if self.lossless and seq > self._consumed_seq:
+                continue
+            if best is None or seq < self._seqs[best]:
+                best = i
+        return best
+
+
+class CaptureThread(threading.Thread):
+    """Reads frames from a cv2.VideoCapture straight into a FrameRing."""
+
+    def __init__(self, capture, ring, name="capture"):
+        super().__init__(name=name, daemon=True)
+        self.capture = capture
+        self.ring = ring
+        self.frames_read = 0
+        self.fps = 0.0
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+        self.ring.close()
+
+    def run(self):
+        window_start = time.time()
+        window_frames = 0
+
+        try:
+            while not self._stop_event.is_set():
+                index = self.ring.acquire_write()
+                if index is None:
+                    break
+
+                slot = self.ring.frames[index]
+                # Passing the slot makes OpenCV decode in place (no new array)
+                ret, out = self.capture.read(slot)
+                if not ret:
+                    self.ring.abort(index)
+                    break
+                if out is not slot:
+                    if out.shape != slot.shape:
+                        self.ring.abort(index)
+                        raise ValueError(f"Frame shape changed from {slot.shape} to {out.shape}")
+                    np.copyto(slot, out)
+
+                self.ring.commit(index)
+                self.frames_read += 1
+
+                window_frames += 1
+                now = time.time()
+                if now - window_start >= 1.0:
+                    self.fps = window_frames / (now - window_start)
+                    window_start = now
+                    window_frames = 0
+        except Exception as e:
+            print(f"Capture thread stopped: {e}")
+        finally:
+            self.ring.close()
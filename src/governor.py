@@ -0,0 +1,220 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def is_rate_limit_error(error):
+    """
+    True for provider quota / rate-limit errors (HTTP 429, RESOURCE_EXHAUSTED)
+
+    Only structured status fields are checked (google-genai APIError.code and
+    .status, ElevenLabs ApiError.status_code, httpx response.status_code);
+    message text is not, since "429" can appear anywhere in it.
+    """
+    if getattr(error, "code", None) == 429 or getattr(error, "status_code", None) == 429:
+        return True
+    if getattr(error, "status", None) == "RESOURCE_EXHAUSTED":
+        return True
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None) == 429
+
+
+def retry_after_seconds(error):
+    """Retry-After hint from an HTTP error's response headers, if it has one"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Refills at `rate` tokens per second up to `capacity`; not thread-safe on its own"""
+
+    def __init__(self, rate, capacity, now=None):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.time() if now is None else now
+
+    def refill(self, now):
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def has(self, amount, now):
+        self.refill(now)
+        return self.tokens >= amount
+
+    def take(self, amount):
+        self.tokens -= amount
+
+    def wait_time(self, amount, now):
+        """Seconds until `amount` tokens are available"""
+        self.refill(now)
+        if self.tokens >= amount or self.rate <= 0:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+
+class ProviderGovernor:
+    """
+    Admission control for one paid API (requests, tokens and spend)
+
+    Every call must fit four buckets at once: the provider's requests per
+    minute, its tokens (or characters) per minute, an hourly spend budget,
+    and the calling client's own request rate. The client rate is the
+    smaller of per_client_rpm and an equal share of the global rpm across
+    recently active clients, so one phone can't starve the rest. A denied
+    call takes nothing from any bucket; callers degrade (cached results,
+    local TTS) instead of calling. A 429 from the provider pauses all calls
+    for the Retry-After hint or `backoff` seconds.
+
+    Limits of 0 or None are not enforced.
+    """
+
+    def __init__(self, name, rpm=None, tpm=None, per_client_rpm=None, budget_per_hour=None,
+                 cost_per_request=0.0, cost_per_1k_tokens=0.0, burst_seconds=10.0,
+                 backoff=30.0, active_window=60.0):
+        """
+        Args:
+            name: Provider name for logs and stats
+            rpm: Provider requests per minute
+            tpm: Provider tokens per minute (characters for TTS)
+            per_client_rpm: Cap on each client's requests per minute
+            budget_per_hour: Spend budget (USD per hour)
+            cost_per_request, cost_per_1k_tokens: Price model for the budget
+            burst_seconds: How many seconds of each rate may be spent at once
+            backoff: Pause after a 429 without a Retry-After hint (seconds)
+            active_window: Clients seen within this many seconds share rpm
+        """
+        self.name = name
+        self.per_client_rpm = per_client_rpm or None
+        self.cost_per_request = cost_per_request
+        self.cost_per_1k_tokens = cost_per_1k_tokens
+        self.burst_seconds = burst_seconds
+        self.backoff = backoff
+        self.active_window = active_window
+
+        now = time.time()
+        self._requests = self._bucket(rpm / 60.0, now) if rpm else None
+        self._tokens = self._bucket(tpm / 60.0, now) if tpm else None
+        # Budget bursts are capped at 5 minutes of spend
+        self._spend = TokenBucket(budget_per_hour / 3600.0, budget_per_hour / 12.0, now) if budget_per_hour else None
+        self._clients = {}          # client_id -> (TokenBucket, last seen)
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+        self.admitted = 0
+        self.denied = {'paused': 0, 'client': 0, 'requests': 0, 'tokens': 0, 'budget': 0}
+        self.rate_limited = 0
+        self.spent = 0.0
+
+    def _bucket(self, rate, now):
+        return TokenBucket(rate, max(1.0, rate * self.burst_seconds), now)
+
+    def cost(self, tokens):
+        return self.cost_per_request + tokens / 1000.0 * self.cost_per_1k_tokens
+
+    def _client_bucket(self, client_id, now):
+        for stale in [c for c, (_, seen) in self._clients.items() if now - seen > self.active_window]:
+            del self._clients[stale]
+
+        entry = self._clients.get(client_id)
+        bucket = entry[0] if entry else None
+        if self.per_client_rpm is None and self._requests is None:
+            return None
+
+        # Fair share of the provider rate among active clients
+        active = len(self._clients) + (entry is None)
+        limits = [r for r in (self.per_client_rpm,
+                              self._requests.rate * 60.0 / active if self._requests else None) if r]
+        rate = min(limits) / 60.0
+        if bucket is None:
+            bucket = self._bucket(rate, now)
+        else:
+            bucket.refill(now)
+            bucket.rate = rate
+            bucket.capacity = max(1.0, rate * self.burst_seconds)
+            bucket.tokens = min(bucket.tokens, bucket.capacity)
+        self._clients[client_id] = (bucket, now)
+        return bucket
+
+    def acquire(self, client_id, tokens=0):
+        """
+        Admit one call for client_id costing `tokens`, or refuse it
+
+        Returns:
+            True if the call may go ahead (its cost is charged), False otherwise
+        """
+        now = time.time()
+        cost = self.cost(tokens)
+        with self._lock:
+            if now < self._paused_until:
+                reason = 'paused'
+            else:
+                client = self._client_bucket(client_id, now)
+                if client is not None and not client.has(1, now):
+                    reason = 'client'
+                elif self._requests is not None and not self._requests.has(1, now):
+                    reason = 'requests'
+                elif self._tokens is not None and tokens and not self._tokens.has(tokens, now):
+                    reason = 'tokens'
+                elif self._spend is not None and cost and not self._spend.has(cost, now):
+                    reason = 'budget'
+                else:
+                    for bucket, amount in ((client, 1), (self._requests, 1), (self._tokens, tokens),
+                                           (self._spend, cost)):
+                        if bucket is not None:
+                            bucket.take(amount)
+                    self.admitted += 1
+                    self.spent += cost
+                    return True
+            self.denied[reason] += 1
+
+        logger.debug('%s: denied call for %s (%s)', self.name, client_id, reason)
+        return False
+
+    def retry_after(self, client_id, tokens=0):
+        """Rough seconds until acquire() could succeed for this client"""
+        now = time.time()
+        with self._lock:
+            waits = [self._paused_until - now]
+            entry = self._clients.get(client_id)
+            if entry:
+                waits.append(entry[0].wait_time(1, now))
+            if self._requests is not None:
+                waits.append(self._requests.wait_time(1, now))
+            if self._tokens is not None and tokens:
+                waits.append(self._tokens.wait_time(tokens, now))
+            if self._spend is not None:
+                waits.append(self._spend.wait_time(self.cost(tokens), now))
+        return max(0.0, max(waits))
+
+    def throttle(self, retry_after=None):
+        """Provider said 429: stop admitting calls for a while"""
+        delay = retry_after if retry_after is not None else self.backoff
+        with self._lock:
+            self.rate_limited += 1
+            self._paused_until = max(self._paused_until, time.time() + delay)
+        logger.warning(f"{self.name} rate limited; pausing calls for {delay:.1f}s")
+
+    def forget(self, client_id):
+        with self._lock:
+            self._clients.pop(client_id, None)
+
+    def stats(self):
+        now = time.time()
+        with self._lock:
+            return {
+                'admitted': self.admitted,
+                'denied': dict(self.denied),
+                'rate_limited': self.rate_limited,
+                'paused_s': round(max(0.0, self._paused_until - now), 1),
+                'active_clients': len(self._clients),
+                'spent_usd': round(self.spent, 4),
+                'budget_left_usd': round(self._spend.tokens, 4) if self._spend is not None else None,
+            }
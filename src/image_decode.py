@@ -0,0 +1,99 @@
+import io
+import logging
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+
+class ImageRejected(ValueError):
+    """Raised for payloads that are refused before (or instead of) decoding."""
+
+
+def _claimed_size(claimed_width, claimed_height):
+    """
+    Client-reported size as positive ints, or None if it wasn't sent
+
+    Raises:
+        ImageRejected: Values that aren't positive integers ("abc", -1, 0)
+    """
+    if claimed_width in (None, "") or claimed_height in (None, ""):
+        return None
+    try:
+        size = int(claimed_width), int(claimed_height)
+    except (TypeError, ValueError):
+        raise ImageRejected(f"Invalid client image size {claimed_width!r}x{claimed_height!r}")
+    if size[0] <= 0 or size[1] <= 0:
+        raise ImageRejected(f"Invalid client image size {size[0]}x{size[1]}")
+    return size
+
+
+def _aspect_matches(width, height, claimed_width, claimed_height, tolerance=0.02):
+    claimed_size = _claimed_size(claimed_width, claimed_height)
+    if claimed_size is None:
+        return True
+    claimed_width, claimed_height = claimed_size
+    actual = width / height
+    # EXIF-rotated phone photos report the sensor orientation
+    for claimed in (claimed_width / claimed_height, claimed_height / claimed_width):
+        if abs(actual - claimed) <= tolerance * claimed:
+            return True
+    return False
+
+
+def decode_frame(image_bytes, claimed_width=None, claimed_height=None, max_dim=1024,
+                 max_bytes=8 * 1024 * 1024, max_pixels=40_000_000):
+    """
+    Decode a client frame directly at (roughly) the size it will be used at
+
+    The header is read first to validate the payload without decoding pixels.
+    For JPEGs, draft() makes libjpeg decode at 1/2, 1/4 or 1/8 scale (DCT
+    scaling), so a 12MP phone photo is never materialized at full size.
+
+    Args:
+        image_bytes: Encoded image
+        claimed_width, claimed_height: Size the client says it sent (optional)
+        max_dim: Longest side of the returned image
+        max_bytes: Reject larger payloads outright
+        max_pixels: Reject images whose header claims more pixels than this
+
+    Returns:
+        (RGB PIL image no larger than max_dim, (original width, original height))
+
+    Raises:
+        ImageRejected: Oversized, mismatched or undecodable payloads, or a
+            claimed size that is not a pair of positive integers
+    """
+    if len(image_bytes) > max_bytes:
+        raise ImageRejected(f"Image payload too large ({len(image_bytes)} bytes)")
+
+    try:
+        # Only parses the header; pixels are decoded by load()
+        pil_image = Image.open(io.BytesIO(image_bytes))
+    except Exception as e:
+        raise ImageRejected(f"Unreadable image: {e}")
+
+    width, height = pil_image.size
+    if width <= 0 or height <= 0 or width * height > max_pixels:
+        raise ImageRejected(f"Image dimensions {width}x{height} not allowed")
+
+    if not _aspect_matches(width, height, claimed_width, claimed_height):
+        raise ImageRejected(
+            f"Image is {width}x{height} but client reported {claimed_width}x{claimed_height}"
+        )
+
+    scale = max_dim / max(width, height)
+    if scale < 1 and pil_image.format == "JPEG":
+        pil_image.draft("RGB", (int(width * scale), int(height * scale)))
+
+    try:
+        pil_image.load()
+    except Exception as e:
+        raise ImageRejected(f"Failed to decode image: {e}")
+
+    if max(pil_image.size) > max_dim:
+        pil_image.thumbnail((max_dim, max_dim), Image.BILINEAR)
+    if pil_image.mode != "RGB":
+        pil_image = pil_image.convert("RGB")
+
+    return pil_image, (width, height)
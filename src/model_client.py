@@ -0,0 +1,316 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from detection_core import probe_models
+from governor import is_rate_limit_error
+from transport import queued_seconds
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """
+    Per-model breaker: opens when the recent error rate is too high
+
+    CLOSED lets everything through. OPEN rejects calls until `cooldown`
+    seconds have passed, then HALF_OPEN lets a single probe through; the probe
+    closes the breaker on success and re-opens it on failure.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, error_threshold=0.5, min_requests=4, window=20, cooldown=30.0):
+        self.error_threshold = error_threshold
+        self.min_requests = min_requests
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.opened_at = 0.0
+        self._outcomes = deque(maxlen=window)
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def error_rate(self):
+        if not self._outcomes:
+            return 0.0
+        return self._outcomes.count(False) / len(self._outcomes)
+
+    def available(self):
+        """True if a call may be attempted now (does not change state)."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                return time.time() - self.opened_at >= self.cooldown
+            return not self._probing
+
+    def try_acquire(self):
+        """
+        Claim permission for one call
+
+        Checks the state, moves OPEN to HALF_OPEN after the cooldown and claims
+        the single probe slot under one lock, so concurrent callers can't both
+        become the probe.
+
+        Returns:
+            True if the call may go ahead
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                if time.time() - self.opened_at < self.cooldown:
+                    return False
+                self.state = self.HALF_OPEN
+            elif self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def record(self, success):
+        with self._lock:
+            self._outcomes.append(success)
+            if self.state == self.HALF_OPEN:
+                self._probing = False
+                if success:
+                    self.state = self.CLOSED
+                    self._outcomes.clear()
+                else:
+                    self._open()
+            elif (self.state == self.CLOSED and len(self._outcomes) >= self.min_requests
+                  and self.error_rate() >= self.error_threshold):
+                self._open()
+
+    def release(self):
+        """Give back a claimed probe slot without an outcome (e.g. rate limited)"""
+        with self._lock:
+            self._probing = False
+
+    def force_open(self):
+        with self._lock:
+            self._open()
+
+    def _open(self):
+        self.state = self.OPEN
+        self.opened_at = time.time()
+        self._probing = False
+
+
+class BreakerOpen(RuntimeError):
+    """A model's breaker refused the call; nothing was sent"""
+
+
+class ModelStats:
+    """Rolling latency samples for one model"""
+
+    def __init__(self, window=50):
+        self.latencies = deque(maxlen=window)
+        self.calls = 0
+        self.failures = 0
+        self.rate_limited = 0
+
+    def percentile(self, q):
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class ResilientModelClient:
+    """
+    Wraps genai.Client.models.generate_content across a list of models
+
+    Calls go to the first model whose breaker is available. A failed call
+    fails over to the next model. If the primary is still running after its
+    p95 latency, a hedged request goes to the next model and whichever
+    answers first wins, so only the slowest ~5% of calls pay twice. The
+    hedge clock starts when a worker starts the call, so time queued for a
+    worker never triggers hedges. Rate-limit errors (429) are not model
+    failures: they don't count against the breaker and are not failed over,
+    since another model on the same key would only spend more quota.
+    """
+
+    def __init__(self, client, models, hedge=True, hedge_min_delay=0.5, hedge_default_delay=3.0,
+                 min_samples=10, cooldown=30.0, max_workers=16, admit_backup=None):
+        """
+        Args:
+            client: genai.Client
+            models: Model names in order of preference (MODELS_TO_TRY)
+            hedge: Send a backup request when the primary is slow
+            hedge_min_delay: Lower bound on the hedge delay (seconds)
+            hedge_default_delay: Hedge delay until min_samples latencies are known
+            min_samples: Latency samples needed before trusting p95
+            cooldown: Seconds a tripped breaker stays open
+            admit_backup: Called with the contents before every request after
+                the first (each hedge and failover), so extra billed calls can
+                be charged; a false result skips it (e.g. over quota)
+        """
+        self.client = client
+        self.models = list(models)
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay
+        self.admit_backup = admit_backup
+        self.hedge_default_delay = hedge_default_delay
+        self.min_samples = min_samples
+
+        self.breakers = {m: CircuitBreaker(cooldown=cooldown) for m in self.models}
+        self.stats_by_model = {m: ModelStats() for m in self.models}
+        self.hedges_sent = 0
+        self.hedges_won = 0
+        self.hedges_denied = 0
+        self.failovers_denied = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="model")
+
+    @property
+    def active_model(self):
+        """First model that would currently receive traffic"""
+        for model in self.models:
+            if self.breakers[model].available():
+                return model
+        return None
+
+    def probe(self):
+        """
+        Check every model once at startup, tripping the breaker of those that fail
+
+        Returns:
+            The first working model, or None
+        """
+        return probe_models(self.client, self.models,
+                            on_unavailable=lambda model, error: self.breakers[model].force_open())
+
+    def _admit(self, contents):
+        return self.admit_backup is None or self.admit_backup(contents)
+
+    def hedge_delay(self, model):
+        stats = self.stats_by_model[model]
+        if len(stats.latencies) < self.min_samples:
+            return self.hedge_default_delay
+        return max(self.hedge_min_delay, stats.percentile(0.95))
+
+    def _call(self, model, contents, config, forced=False, started=None):
+        if started is not None:
+            started.set()
+        breaker = self.breakers[model]
+        stats = self.stats_by_model[model]
+        if not breaker.try_acquire() and not forced:
+            raise BreakerOpen(f"Circuit breaker for {model} is {breaker.state}")
+        start = time.time()
+        queued = queued_seconds()
+        try:
+            response = self.client.models.generate_content(model=model, contents=contents, config=config)
+        except Exception as e:
+            stats.calls += 1
+            if is_rate_limit_error(e):
+                stats.rate_limited += 1
+                breaker.release()
+            else:
+                stats.failures += 1
+                breaker.record(False)
+            raise
+        stats.calls += 1
+        # Time spent waiting for a per-host slot is local queueing, not model
+        # latency; counting it would inflate p95 and trigger needless hedges
+        stats.latencies.append(time.time() - start - (queued_seconds() - queued))
+        breaker.record(True)
+        return response
+
+    def generate_content(self, contents, config=None):
+        """
+        Same contract as client.models.generate_content, minus the model argument
+
+        Raises:
+            The last model error if every available model failed
+        """
+        candidates = [m for m in self.models if self.breakers[m].available()]
+        forced = not candidates
+        if forced:
+            # Everything is tripped; try the preferred model anyway rather than fail fast forever
+            candidates = self.models[:1]
+
+        last_error = None
+        pending = {}
+        next_index = 0
+        hedged = False
+
+        while next_index < len(candidates) or pending:
+            if not pending:
+                if next_index > 0 and not self._admit(contents):
+                    # A failover is another billed request; over quota, report the failure
+                    self.failovers_denied += 1
+                    logger.debug("Failover not admitted")
+                    break
+                model = candidates[next_index]
+                next_index += 1
+                started = threading.Event()
+                pending[self._executor.submit(self._call, model, contents, config, forced, started)] = model
+                timeout = None
+                if self.hedge:
+                    # Hedge on the model's latency, not on time spent waiting for a worker
+                    started.wait()
+                    timeout = self.hedge_delay(model)
+            else:
+                timeout = None
+
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            if not done:
+                # Primary is slower than its p95: hedge to the next model
+                if next_index < len(candidates):
+                    if not self._admit(contents):
+                        self.hedges_denied += 1
+                        logger.debug("Hedge not admitted; waiting for the primary")
+                        continue
+                    model = candidates[next_index]
+                    next_index += 1
+                    self.hedges_sent += 1
+                    hedged = True
+                    logger.info(f"Hedging slow request to {model}")
+                    pending[self._executor.submit(self._call, model, contents, config, forced)] = model
+                continue
+
+            for future in done:
+                model = pending.pop(future)
+                try:
+                    response = future.result()
+                except Exception as e:
+                    logger.warning(f"Model {model} failed: {e}")
+                    last_error = e
+                    if is_rate_limit_error(e):
+                        # Quota, not the model: no failover or further hedges
+                        next_index = len(candidates)
+                    continue
+                if hedged and model != candidates[0]:
+                    self.hedges_won += 1
+                return response
+
+        raise last_error
+
+    def stats(self):
+        result = {
+            'active_model': self.active_model,
+            'hedges_sent': self.hedges_sent,
+            'hedges_won': self.hedges_won,
+            'hedges_denied': self.hedges_denied,
+            'failovers_denied': self.failovers_denied,
+            'models': {}
+        }
+        for model in self.models:
+            stats = self.stats_by_model[model]
+            breaker = self.breakers[model]
+            p50 = stats.percentile(0.5)
+            p95 = stats.percentile(0.95)
+            result['models'][model] = {
+                'state': breaker.state,
+                'calls': stats.calls,
+                'failures': stats.failures,
+                'rate_limited': stats.rate_limited,
+                'error_rate': round(breaker.error_rate(), 3),
+                'p50_s': round(p50, 3) if p50 is not None else None,
+                'p95_s': round(p95, 3) if p95 is not None else None,
+            }
+        return result
@@ -0,0 +1,137 @@
+import threading
+import time
+
+
+def box_iou(a, b):
+    """Intersection over union of two normalized {'x','y','width','height'} boxes"""
+    ix = max(0.0, min(a['x'] + a['width'], b['x'] + b['width']) - max(a['x'], b['x']))
+    iy = max(0.0, min(a['y'] + a['height'], b['y'] + b['height']) - max(a['y'], b['y']))
+    inter = ix * iy
+    union = a['width'] * a['height'] + b['width'] * b['height'] - inter
+    return inter / union if union > 0 else 0.0
+
+
+def match_detections(previous, current, min_iou=0.2):
+    """
+    Greedily pair detections across two frames by label and box overlap
+
+    Returns:
+        Dict mapping index in current -> index in previous
+    """
+    pairs = []
+    for i, cur in enumerate(current):
+        for j, prev in enumerate(previous):
+            if cur['label'].lower() != prev['label'].lower():
+                continue
+            overlap = box_iou(cur, prev)
+            if overlap >= min_iou:
+                pairs.append((overlap, i, j))
+
+    pairs.sort(reverse=True)
+    matches = {}
+    used = set()
+    for _, i, j in pairs:
+        if i in matches or j in used:
+            continue
+        matches[i] = j
+        used.add(j)
+    return matches
+
+
+class HazardRanker:
+    """
+    Orders detections so the most urgent obstacle comes first
+
+    Each detection gets a 0-1 priority from four cues:
+      - proximity: estimated distance (box size when distance is unknown)
+      - size: fraction of the frame the box covers
+      - path: how central and how low in the frame it is (the walking path)
+      - approach: how fast it is getting closer, from the previous frame
+    Only the top_k highest priorities are kept.
+    """
+
+    def __init__(self, top_k=5, near_m=5.0, fast_mps=1.5,
+                 weights=(0.4, 0.1, 0.3, 0.2)):
+        """
+        Args:
+            top_k: Detections to keep (0 keeps all)
+            near_m: Distance at which proximity drops to zero (meters)
+            fast_mps: Approach speed that counts as maximally urgent (m/s)
+            weights: (proximity, size, path, approach) weights
+        """
+        self.top_k = top_k
+        self.near_m = near_m
+        self.fast_mps = fast_mps
+        self.weights = weights
+        self._previous = {}
+        self._lock = threading.Lock()
+
+    def forget(self, session_id):
+        with self._lock:
+            self._previous.pop(session_id, None)
+
+    def _approach_speed(self, det, prev, dt):
+        """Positive when the object is getting closer (m/s, or area growth per second)"""
+        if dt <= 0:
+            return 0.0
+        if det.get('distance_m') is not None and prev.get('distance_m') is not None:
+            return (prev['distance_m'] - det['distance_m']) / dt
+        prev_area = prev['width'] * prev['height']
+        if prev_area <= 0:
+            return 0.0
+        # Without distances, relative box growth stands in for approach
+        return (det['width'] * det['height'] / prev_area - 1.0) * self.fast_mps / dt
+
+    def score(self, det, approach):
+        area = max(0.0, det['width'] * det['height'])
+        distance = det.get('distance_m')
+        if distance is not None:
+            proximity = max(0.0, 1.0 - distance / self.near_m)
+        else:
+            proximity = min(1.0, area * 2.0)
+
+        size = min(1.0, area * 4.0)
+
+        center_x = det['x'] + det['width'] / 2
+        bottom = det['y'] + det['height']
+        centrality = max(0.0, 1.0 - abs(center_x - 0.5) * 2.0)
+        path = centrality * (0.5 + 0.5 * min(1.0, max(0.0, bottom)))
+
+        urgency = min(1.0, max(0.0, approach) / self.fast_mps)
+
+        w_prox, w_size, w_path, w_approach = self.weights
+        return w_prox * proximity + w_size * size + w_path * path + w_approach * urgency
+
+    def rank(self, session_id, detections, now=None):
+        """
+        Score, sort and cap a frame's detections
+
+        Args:
+            session_id: Key for the previous frame used for approach velocity
+            detections: List of detection dicts (x, y, width, height, label, distance_m)
+            now: Timestamp override (defaults to time.time())
+
+        Returns:
+            New list, most urgent first, with 'priority' and 'approach_mps' added
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            previous, previous_time = self._previous.get(session_id, ((), now))
+            self._previous[session_id] = (detections, now)
+
+        matches = match_detections(previous, detections) if previous else {}
+        dt = now - previous_time
+
+        ranked = []
+        for i, det in enumerate(detections):
+            approach = self._approach_speed(det, previous[matches[i]], dt) if i in matches else 0.0
+            ranked.append(dict(
+                det,
+                priority=round(self.score(det, approach), 3),
+                approach_mps=round(approach, 2)
+            ))
+
+        ranked.sort(key=lambda d: d['priority'], reverse=True)
+        if self.top_k:
+            ranked = ranked[:self.top_k]
+        return ranked
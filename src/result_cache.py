@@ -0,0 +1,110 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+
+def frame_key(image_bytes, *params):
+    """
+    Content hash of a frame plus the client params that change its result
+
+    Uses xxh3-128 when xxhash is installed, BLAKE2b-128 otherwise.
+    """
+    hasher = xxhash.xxh3_128() if xxhash is not None else hashlib.blake2b(digest_size=16)
+    hasher.update(image_bytes)
+    for param in params:
+        hasher.update(b"\x00")
+        hasher.update(repr(param).encode())
+    return hasher.hexdigest()
+
+
+class ResultCache:
+    """
+    Short-TTL LRU of results with single-flight computation
+
+    An exact repeat within ttl seconds gets the stored result. A repeat that
+    arrives while the first copy is still being computed waits for that
+    computation instead of starting another. Failures are not cached.
+    """
+
+    HIT = "hit"
+    JOINED = "joined"
+    MISS = "miss"
+
+    def __init__(self, ttl=10.0, max_entries=256):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.joins = 0
+        self.misses = 0
+        self._entries = OrderedDict()   # key -> (expires_at, value)
+        self._in_flight = {}            # key -> Future
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute):
+        """
+        Args:
+            key: Cache key (see frame_key)
+            compute: Zero-argument callable producing the value
+
+        Returns:
+            (value, status) where status is HIT, JOINED or MISS
+
+        Raises:
+            Whatever compute raised (also for callers that joined it)
+        """
+        now = time.time()
+        owner = False
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1], self.HIT
+                del self._entries[key]
+
+            future = self._in_flight.get(key)
+            if future is not None:
+                self.joins += 1
+            else:
+                future = Future()
+                self._in_flight[key] = future
+                self.misses += 1
+                owner = True
+
+        if not owner:
+            return future.result(), self.JOINED
+
+        try:
+            value = compute()
+        except BaseException as e:
+            with self._lock:
+                del self._in_flight[key]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            del self._in_flight[key]
+            self._entries[key] = (time.time() + self.ttl, value)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        future.set_result(value)
+        return value, self.MISS
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'in_flight': len(self._in_flight),
+                'hits': self.hits,
+                'joins': self.joins,
+                'misses': self.misses,
+                'ttl_s': self.ttl,
+            }
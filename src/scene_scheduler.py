@@ -0,0 +1,127 @@
+import time
+
+import numpy as np
+
+
+class SceneChangeScheduler:
+    """
+    Decides when a frame is worth sending to the (expensive) detector
+
+    Each frame is reduced to a tiny grayscale thumbnail and compared with the
+    thumbnail of the last frame that was actually detected. The detector fires
+    when the mean absolute difference crosses a threshold, when the caller
+    reports that the user is moving, or when the last result is too old.
+    """
+
+    def __init__(self, change_threshold=12.0, min_interval=0.5, max_staleness=5.0,
+                 thumbnail_size=(64, 48)):
+        """
+        Args:
+            change_threshold: Mean absolute gray-level difference (0-255) that
+                              counts as a scene change
+            min_interval: Never fire more often than this (seconds)
+            max_staleness: Always fire if the last detection is older than this (seconds)
+            thumbnail_size: (width, height) the frame is subsampled to
+        """
+        self.change_threshold = change_threshold
+        self.min_interval = min_interval
+        self.max_staleness = max_staleness
+        self.thumbnail_size = thumbnail_size
+
+        self.last_fire_time = None
+        self.last_score = 0.0
+        self.last_reason = None
+        self.fired = 0
+        self.skipped = 0
+
+        # Allocated on the first frame, reused afterwards
+        self._reference = None
+        self._current = None
+        self._diff = None
+        self._steps = None
+
+    def _thumbnail(self, frame):
+        """Subsample frame into the reused current buffer (no resize allocation)."""
+        if frame.ndim == 3:
+            # Green channel is a cheap stand-in for luma
+            frame = frame[:, :, 1]
+
+        if self._steps is None or self._steps[2] != frame.shape:
+            width, height = self.thumbnail_size
+            step_y = max(1, frame.shape[0] // height)
+            step_x = max(1, frame.shape[1] // width)
+            shape = frame[::step_y, ::step_x].shape
+            self._steps = (step_y, step_x, frame.shape)
+            self._current = np.empty(shape, dtype=np.uint8)
+            self._reference = None
+            self._diff = np.empty(shape, dtype=np.int16)
+
+        step_y, step_x, _ = self._steps
+        np.copyto(self._current, frame[::step_y, ::step_x], casting="unsafe")
+        return self._current
+
+    def change_score(self, frame):
+        """Mean absolute difference between frame and the last detected frame (0-255)."""
+        current = self._thumbnail(frame)
+        if self._reference is None:
+            return float("inf")
+        np.subtract(current, self._reference, out=self._diff, dtype=np.int16)
+        np.abs(self._diff, out=self._diff)
+        return float(self._diff.mean())
+
+    def should_detect(self, frame, moving=False, force=False, now=None):
+        """
+        Feed one frame and decide whether to run the detector on it
+
+        Args:
+            frame: uint8 image, gray (H, W) or color (H, W, C)
+            moving: Caller knows the user/camera is moving
+            force: Fire regardless of cadence (e.g. manual trigger)
+            now: Timestamp override (defaults to time.time())
+
+        Returns:
+            True if the detector should run on this frame
+        """
+        now = time.time() if now is None else now
+        score = self.change_score(frame)
+        self.last_score = score
+
+        reason = None
+        if force:
+            reason = "forced"
+        elif self.last_fire_time is None:
+            reason = "first"
+        elif now - self.last_fire_time < self.min_interval:
+            reason = None
+        elif moving:
+            reason = "moving"
+        elif score >= self.change_threshold:
+            reason = "scene_change"
+        elif now - self.last_fire_time >= self.max_staleness:
+            reason = "stale"
+
+        if reason is None:
+            self.skipped += 1
+            return False
+
+        self.last_reason = reason
+        self.last_fire_time = now
+        self.fired += 1
+        if self._reference is None:
+            self._reference = self._current.copy()
+        else:
+            np.copyto(self._reference, self._current)
+        return True
+
+    def reset(self):
+        """Forget the reference frame so the next frame always fires."""
+        self._reference = None
+        self.last_fire_time = None
+
+    def stats(self):
+        return {
+            'fired': self.fired,
+            'skipped': self.skipped,
+            'last_score': round(self.last_score, 2) if self.last_score != float("inf") else None,
+            'last_reason': self.last_reason,
+        }
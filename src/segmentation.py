@@ -3,22 +3,13 @@ from google.genai import types
 from PIL import Image, ImageDraw
 import io
 import base64
-import json
 import numpy as np
 import os
 
+from detection_core import parse_json
 
-client = genai.Client()
 
-def parse_json(json_output: str):
-  # Parsing out the markdown fencing
-  lines = json_output.splitlines()
-  for i, line in enumerate(lines):
-    if line == "```json":
-      json_output = "\n".join(lines[i+1:])  # Remove everything before "```json"
-      output = json_output.split("```")[0]  # Remove everything after the closing "```"
-      break  # Exit the loop once "```json" is found
-  return json_output
+client = genai.Client()
 
 def extract_segmentation_masks(image_path: str, output_dir: str = "segmentation_outputs"):
   # Load and resize image
@@ -43,7 +34,7 @@ def extract_segmentation_masks(image_path: str, output_dir: str = "segmentation_
   )
 
   # Parse JSON response
-  items = json.loads(parse_json(response.text))
+  items = parse_json(response.text)
 
   # Create output directory
   os.makedirs(output_dir, exist_ok=True)
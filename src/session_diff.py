@@ -0,0 +1,143 @@
+import itertools
+import threading
+import time
+
+from ranking import match_detections
+
+# Fields sent for a track; priority/approach ride along but never trigger a move
+TRACK_FIELDS = ('x', 'y', 'width', 'height', 'label', 'confidence', 'distance_m',
+                'priority', 'approach_mps')
+
+
+class _Session:
+    def __init__(self):
+        self.seq = 0
+        self.tracks = []        # last state sent to the client, each with 'id'
+        self.order = []
+        self.touched = time.time()
+
+
+class SessionDiffer:
+    """
+    Per-session detection state for the incremental result protocol
+
+    Each update matches the new detections against the tracks the client
+    already has (same label, overlapping box) and returns only what changed:
+    added tracks, removed track ids, and tracks that moved or changed
+    distance by more than the thresholds. Every update bumps the session's
+    seq; a client whose last seq differs from baseSeq has missed a diff and
+    should resume, which answers with a full snapshot.
+    """
+
+    def __init__(self, ttl=300.0, move_threshold=0.03, distance_threshold=0.25, min_iou=0.2):
+        """
+        Args:
+            ttl: Seconds an idle session is kept for resumption
+            move_threshold: Box edge shift (normalized) that counts as a move
+            distance_threshold: Distance change (meters) that counts as a move
+            min_iou: Overlap needed to treat two boxes as the same object
+        """
+        self.ttl = ttl
+        self.move_threshold = move_threshold
+        self.distance_threshold = distance_threshold
+        self.min_iou = min_iou
+        self._sessions = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._last_sweep = time.time()
+
+    def _session(self, session_id, now):
+        if now - self._last_sweep > self.ttl / 10:
+            self._last_sweep = now
+            for sid in [s for s, session in self._sessions.items() if now - session.touched > self.ttl]:
+                del self._sessions[sid]
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._sessions[session_id] = _Session()
+        session.touched = now
+        return session
+
+    def _moved(self, old, new):
+        for field in ('x', 'y', 'width', 'height'):
+            if abs(new[field] - old[field]) > self.move_threshold:
+                return True
+        old_distance, new_distance = old.get('distance_m'), new.get('distance_m')
+        if (old_distance is None) != (new_distance is None):
+            return True
+        return new_distance is not None and abs(new_distance - old_distance) > self.distance_threshold
+
+    def update(self, session_id, detections):
+        """
+        Args:
+            session_id: Client-chosen id that survives reconnects
+            detections: Ranked detection dicts for the new frame
+
+        Returns:
+            Dict with seq, baseSeq, added (tracks), removed (ids), moved
+            (tracks) and order (ids, most urgent first; None if unchanged)
+        """
+        with self._lock:
+            session = self._session(session_id, time.time())
+            matches = match_detections(session.tracks, detections, self.min_iou)
+
+            added, moved, tracks = [], [], []
+            for i, det in enumerate(detections):
+                track = {field: det.get(field) for field in TRACK_FIELDS}
+                if i in matches:
+                    old = session.tracks[matches[i]]
+                    track['id'] = old['id']
+                    if self._moved(old, track):
+                        moved.append(track)
+                    else:
+                        # Keep the state the client has so small drifts accumulate
+                        track = old
+                else:
+                    track['id'] = next(self._ids)
+                    added.append(track)
+                tracks.append(track)
+
+            kept = {track['id'] for track in tracks}
+            removed = [track['id'] for track in session.tracks if track['id'] not in kept]
+            order = [track['id'] for track in tracks]
+
+            base_seq = session.seq
+            session.seq += 1
+            session.tracks = tracks
+            order_changed = order != session.order
+            session.order = order
+
+            return {
+                'seq': session.seq,
+                'baseSeq': base_seq,
+                'added': added,
+                'removed': removed,
+                'moved': moved,
+                'order': order if order_changed else None,
+            }
+
+    def snapshot(self, session_id):
+        """
+        Full state for a session, creating an empty one if it is unknown
+
+        Returns:
+            Dict with seq and detections (tracks in priority order)
+        """
+        with self._lock:
+            session = self._session(session_id, time.time())
+            return {'seq': session.seq, 'detections': list(session.tracks)}
+
+    def resume(self, session_id, last_seq):
+        """
+        Returns:
+            None if the client is up to date at last_seq, else snapshot()
+        """
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None and session.seq == last_seq:
+                session.touched = time.time()
+                return None
+        return self.snapshot(session_id)
+
+    def stats(self):
+        with self._lock:
+            return {'sessions': len(self._sessions), 'ttl_s': self.ttl}
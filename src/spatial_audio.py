@@ -0,0 +1,145 @@
+import io
+import os
+import wave
+
+import numpy as np
+
+# Base pitch (Hz) per kind of object so categories are distinguishable by ear
+EARCON_PITCH = {
+    "person": 660.0,
+    "chair": 440.0,
+    "door": 520.0,
+    "stairs": 880.0,
+    "car": 330.0,
+}
+DEFAULT_PITCH = 392.0
+
+# (max distance m, rate/pitch factor, gain); closer = higher, faster, louder
+DISTANCE_BANDS = (
+    (1.0, 1.5, 1.0),
+    (2.0, 1.25, 0.85),
+    (3.0, 1.0, 0.7),
+    (float("inf"), 0.8, 0.55),
+)
+UNKNOWN_BAND = (None, 0.9, 0.45)
+
+
+def _band(distance_m):
+    if distance_m is None:
+        return len(DISTANCE_BANDS)
+    for i, (limit, _, _) in enumerate(DISTANCE_BANDS):
+        if distance_m < limit:
+            return i
+    return len(DISTANCE_BANDS) - 1
+
+
+class EarconRenderer:
+    """
+    Turns a ranked detection list into one short stereo cue
+
+    Each detection becomes a precomputed earcon (or a word clip, if one is
+    available for its label) resampled by distance band and panned by the
+    box's horizontal center, then all are mixed into a single PCM WAV buffer.
+    A whole scene takes a fraction of a second instead of one sentence per
+    object.
+    """
+
+    def __init__(self, sample_rate=22050, duration=0.12, spacing=0.09, clips_dir=None):
+        """
+        Args:
+            sample_rate: Output sample rate (Hz)
+            duration: Length of a generated earcon (seconds)
+            spacing: Offset between consecutive cues (seconds); cues may overlap
+            clips_dir: Optional directory of mono 16-bit <label>.wav word clips
+        """
+        self.sample_rate = sample_rate
+        self.spacing = spacing
+        self.duration = duration
+
+        bases = {label: self._tone(pitch) for label, pitch in EARCON_PITCH.items()}
+        bases[None] = self._tone(DEFAULT_PITCH)
+        if clips_dir and os.path.isdir(clips_dir):
+            bases.update(self._load_clips(clips_dir))
+
+        # Every (label, band) variant is rendered once up front
+        bands = DISTANCE_BANDS + (UNKNOWN_BAND,)
+        self.table = {
+            (label, i): self._resample(base, factor) * gain
+            for label, base in bases.items()
+            for i, (_, factor, gain) in enumerate(bands)
+        }
+
+    def _tone(self, pitch):
+        t = np.arange(int(self.sample_rate * self.duration), dtype=np.float32) / self.sample_rate
+        envelope = np.minimum(1.0, np.minimum(t, t[-1] - t) / 0.01)  # 10 ms fade in/out
+        return (np.sin(2 * np.pi * pitch * t) * envelope * 0.6).astype(np.float32)
+
+    def _load_clips(self, clips_dir):
+        clips = {}
+        for filename in os.listdir(clips_dir):
+            label, ext = os.path.splitext(filename)
+            if ext.lower() != ".wav":
+                continue
+            with wave.open(os.path.join(clips_dir, filename), "rb") as clip:
+                if clip.getnchannels() != 1 or clip.getsampwidth() != 2:
+                    continue
+                samples = np.frombuffer(clip.readframes(clip.getnframes()), dtype=np.int16)
+                samples = samples.astype(np.float32) / 32768.0
+                if clip.getframerate() != self.sample_rate:
+                    samples = self._resample(samples, clip.getframerate() / self.sample_rate)
+                clips[label.lower()] = samples
+        return clips
+
+    @staticmethod
+    def _resample(samples, factor):
+        """Play `samples` `factor` times faster (raises pitch and shortens it)"""
+        length = max(1, int(len(samples) / factor))
+        positions = np.linspace(0, len(samples) - 1, length, dtype=np.float32)
+        return np.interp(positions, np.arange(len(samples), dtype=np.float32), samples).astype(np.float32)
+
+    def _clip_for(self, label, band):
+        label = (label or "").lower()
+        if (label, band) in self.table:
+            return self.table[(label, band)]
+        for known, i in self.table:
+            if i == band and known and known in label:
+                return self.table[(known, band)]
+        return self.table[(None, band)]
+
+    def render(self, detections):
+        """
+        Args:
+            detections: Ranked detection dicts with x, width, label, distance_m
+
+        Returns:
+            WAV bytes (16-bit stereo), or None for an empty list
+        """
+        if not detections:
+            return None
+
+        cues = []
+        for i, det in enumerate(detections):
+            clip = self._clip_for(det.get('label'), _band(det.get('distance_m')))
+            center_x = det.get('x', 0.5) + det.get('width', 0.0) / 2
+            pan = min(1.0, max(-1.0, center_x * 2.0 - 1.0))
+            cues.append((int(i * self.spacing * self.sample_rate), clip, pan))
+
+        total = max(start + len(clip) for start, clip, _ in cues)
+        mix = np.zeros((total, 2), dtype=np.float32)
+        for start, clip, pan in cues:
+            # Constant-power panning
+            angle = (pan + 1.0) * np.pi / 4
+            end = start + len(clip)
+            mix[start:end, 0] += clip * np.cos(angle)
+            mix[start:end, 1] += clip * np.sin(angle)
+
+        np.clip(mix, -1.0, 1.0, out=mix)
+        pcm = (mix * 32767).astype(np.int16)
+
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as out:
+            out.setnchannels(2)
+            out.setsampwidth(2)
+            out.setframerate(self.sample_rate)
+            out.writeframes(pcm.tobytes())
+        return buffer.getvalue()
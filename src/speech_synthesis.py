@@ -0,0 +1,145 @@
+import os
+import queue
+import sys
+import threading
+from concurrent.futures import Future
+
+import azure.cognitiveservices.speech as speechsdk
+
+from tts import TTSBackend
+
+# This module requires environment variables named "SPEECH_KEY" and "ENDPOINT"
+# Replace with your own subscription key and endpoint, the endpoint is like : "https://YourServiceRegion.api.cognitive.microsoft.com"
+
+# The neural multilingual voice can speak different languages based on the input text.
+DEFAULT_VOICE = 'es-AR-TomasNeural'  # languages: https://learn.microsoft.com/en-us/azure/ai-services/speech-service/language-support?tabs=tts#text-to-speech
+
+_STOP = object()
+
+
+class SpeechSynthesisWorker(TTSBackend):
+    """
+    Long-lived Azure speech synthesizer behind the TTSBackend interface
+
+    One SpeechSynthesizer and one pre-opened service connection are reused for
+    every utterance. Requests go through a queue: a submitter thread keeps up
+    to max_in_flight speak_text_async() calls outstanding while a completer
+    thread resolves them in order, so per-utterance setup is paid once.
+    """
+
+    name = "azure"
+    mime_type = "audio/mpeg"
+
+    def __init__(self, key=None, endpoint=None, voice=DEFAULT_VOICE, to_speaker=False, max_in_flight=4):
+        """
+        Args:
+            key: Speech resource key (defaults to SPEECH_KEY)
+            endpoint: Speech endpoint (defaults to ENDPOINT)
+            voice: Synthesis voice name
+            to_speaker: Play on the default speaker instead of rendering to memory
+            max_in_flight: speak_text_async() calls allowed to overlap
+        """
+        speech_config = speechsdk.SpeechConfig(
+            subscription=key or os.environ.get('SPEECH_KEY'),
+            endpoint=endpoint or os.environ.get('ENDPOINT')
+        )
+        speech_config.speech_synthesis_voice_name = voice
+        speech_config.set_speech_synthesis_output_format(
+            speechsdk.SpeechSynthesisOutputFormat.Audio16Khz32KBitRateMonoMp3
+        )
+
+        # audio_config=None keeps the audio in result.audio_data (in-memory buffer)
+        audio_config = speechsdk.audio.AudioOutputConfig(use_default_speaker=True) if to_speaker else None
+        self.synthesizer = speechsdk.SpeechSynthesizer(speech_config=speech_config, audio_config=audio_config)
+
+        # Open the service connection now so the first utterance doesn't pay for it
+        self.connection = speechsdk.Connection.from_speech_synthesizer(self.synthesizer)
+        self.connection.open(True)
+
+        self._requests = queue.Queue()
+        self._pending = queue.Queue()
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._submitter = threading.Thread(target=self._submit_loop, name="azure-tts-submit", daemon=True)
+        self._completer = threading.Thread(target=self._complete_loop, name="azure-tts-complete", daemon=True)
+        self._submitter.start()
+        self._completer.start()
+
+    def submit(self, text):
+        """Queue an utterance; returns a Future resolving to its audio bytes."""
+        future = Future()
+        self._requests.put((text, future))
+        return future
+
+    def synthesize(self, text):
+        return self.submit(text).result()
+
+    def stream(self, text):
+        yield self.synthesize(text)
+
+    def close(self):
+        self._requests.put(_STOP)
+        self._submitter.join()
+        self._completer.join()
+        self.connection.close()
+
+    def _submit_loop(self):
+        while True:
+            request = self._requests.get()
+            if request is _STOP:
+                self._pending.put(_STOP)
+                return
+            text, future = request
+            self._slots.acquire()
+            try:
+                self._pending.put((text, future, self.synthesizer.speak_text_async(text)))
+            except Exception as e:
+                self._slots.release()
+                future.set_exception(e)
+
+    def _complete_loop(self):
+        while True:
+            pending = self._pending.get()
+            if pending is _STOP:
+                return
+            text, future, result_future = pending
+            try:
+                future.set_result(self._audio(result_future.get(), text))
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                self._slots.release()
+
+    @staticmethod
+    def _audio(speech_synthesis_result, text):
+        if speech_synthesis_result.reason == speechsdk.ResultReason.SynthesizingAudioCompleted:
+            return speech_synthesis_result.audio_data
+
+        message = f"Speech synthesis failed for text [{text}]: {speech_synthesis_result.reason}"
+        if speech_synthesis_result.reason == speechsdk.ResultReason.Canceled:
+            cancellation_details = speech_synthesis_result.cancellation_details
+            message = f"Speech synthesis canceled: {cancellation_details.reason}"
+            if cancellation_details.reason == speechsdk.CancellationReason.Error and cancellation_details.error_details:
+                message += f" ({cancellation_details.error_details}). Did you set the speech resource key and endpoint values?"
+        raise RuntimeError(message)
+
+
+if __name__ == "__main__":
+    # Speak every line from stdin until EOF or "exit"
+    worker = SpeechSynthesisWorker(to_speaker=True)
+    print("Enter some text that you want to speak (\"exit\" to quit) >")
+    try:
+        for line in sys.stdin:
+            text = line.strip()
+            if text.lower() in ("exit", "quit"):
+                break
+            if not text:
+                continue
+            try:
+                worker.synthesize(text)
+                print("Speech synthesized for text [{}]".format(text))
+            except RuntimeError as e:
+                print(e)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        worker.close()
@@ -0,0 +1,126 @@
+import hashlib
+import io
+import json
+import random
+import threading
+import time
+import wave
+
+from tts import TTSBackend
+
+STUB_LABELS = ["person", "chair", "table", "door", "bottle", "laptop", "car", "bicycle"]
+
+
+class StubResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class StubModelClient:
+    """
+    Offline stand-in for ResilientModelClient (DETECTOR_BACKEND=stub)
+
+    Answers generate_content() after a configurable delay with plausible
+    detections derived from the image content, so the same frame always gets
+    the same boxes and different frames look like scene changes. Speaks the
+    same single-image and batched JSON formats as Gemini.
+    """
+
+    name = "stub"
+
+    def __init__(self, latency=0.3, jitter=0.1, failure_rate=0.0, max_objects=4, seed=None):
+        """
+        Args:
+            latency: Base response time per call (seconds)
+            jitter: Uniform random extra delay up to this many seconds
+            failure_rate: Fraction of calls that raise RuntimeError
+            max_objects: Upper bound on detections per image
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.max_objects = max_objects
+        self.calls = 0
+        self.failures = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @property
+    def active_model(self):
+        return self.name
+
+    def probe(self):
+        return self.name
+
+    def detections_for(self, image):
+        """Deterministic detections for a PIL image (box_2d normalized to 0-1000)"""
+        digest = hashlib.blake2b(image.resize((8, 8)).tobytes(), digest_size=8).digest()
+        rng = random.Random(digest)
+        detections = []
+        for _ in range(rng.randint(1, self.max_objects)):
+            width, height = rng.randint(80, 400), rng.randint(120, 600)
+            x, y = rng.randint(0, 1000 - width), rng.randint(0, 1000 - height)
+            detections.append({"box_2d": [y, x, y + height, x + width], "label": rng.choice(STUB_LABELS)})
+        return detections
+
+    def generate_content(self, contents, config=None):
+        with self._lock:
+            self.calls += 1
+            delay = self.latency + self._random.uniform(0, self.jitter)
+            fail = self._random.random() < self.failure_rate
+            if fail:
+                self.failures += 1
+        time.sleep(delay)
+        if fail:
+            raise RuntimeError("Injected stub model failure")
+
+        images = [c for c in contents if hasattr(c, "resize")]
+        if len(images) == 1:
+            return StubResponse(json.dumps(self.detections_for(images[0])))
+        return StubResponse(json.dumps([
+            {"image": i, "detections": self.detections_for(image)} for i, image in enumerate(images)
+        ]))
+
+    def stats(self):
+        return {
+            'active_model': self.name,
+            'calls': self.calls,
+            'failures': self.failures,
+            'latency_s': self.latency,
+        }
+
+
+class StubTTSBackend(TTSBackend):
+    """
+    Offline TTS stand-in (TTS_BACKEND=stub): silent WAV whose length and
+    synthesis time scale with the text
+    """
+
+    name = "stub"
+    mime_type = "audio/wav"
+
+    def __init__(self, first_chunk_latency=0.15, per_char=0.002, sample_rate=16000, chunks=4):
+        self.first_chunk_latency = first_chunk_latency
+        self.per_char = per_char
+        self.sample_rate = sample_rate
+        self.chunks = chunks
+
+    def _wav(self, text):
+        # ~60 ms of audio per character, roughly speaking pace
+        frames = int(self.sample_rate * 0.06 * len(text))
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as out:
+            out.setnchannels(1)
+            out.setsampwidth(2)
+            out.setframerate(self.sample_rate)
+            out.writeframes(b"\x00\x00" * frames)
+        return buffer.getvalue()
+
+    def stream(self, text):
+        time.sleep(self.first_chunk_latency)
+        audio = self._wav(text)
+        step = -(-len(audio) // self.chunks)
+        for i in range(0, len(audio), step):
+            if i:
+                time.sleep(self.per_char * len(text) / self.chunks)
+            yield audio[i:i + step]
@@ -0,0 +1,167 @@
+import importlib.util
+import logging
+import os
+import threading
+import time
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Per-thread total of seconds spent waiting for a per-host slot
+_queue_wait = threading.local()
+
+
+def queued_seconds():
+    """
+    Seconds this thread has spent waiting for per-host slots so far
+
+    Callers timing a request subtract the difference across the call to get
+    the provider's latency without the local queue.
+    """
+    return getattr(_queue_wait, 'total', 0.0)
+
+
+def transport_settings():
+    """
+    HTTP transport tuning, read from the environment
+
+    HTTP_MAX_CONNECTIONS      total pooled connections (default 32)
+    HTTP_MAX_KEEPALIVE        idle connections kept open (default 16)
+    HTTP_KEEPALIVE_EXPIRY     seconds an idle connection is kept (default 60)
+    HTTP_PER_HOST_LIMIT       concurrent requests per host (default 8)
+    HTTP_CONNECT_TIMEOUT      seconds (default 5)
+    HTTP_TIMEOUT              read/write timeout in seconds (default 30)
+    HTTP_CONNECT_RETRIES      retries on connection errors (default 1)
+    HTTP2                     "1" to use HTTP/2 when the h2 package is installed (default 1)
+    """
+    return {
+        'max_connections': int(os.environ.get('HTTP_MAX_CONNECTIONS', 32)),
+        'max_keepalive': int(os.environ.get('HTTP_MAX_KEEPALIVE', 16)),
+        'keepalive_expiry': float(os.environ.get('HTTP_KEEPALIVE_EXPIRY', 60.0)),
+        'per_host_limit': int(os.environ.get('HTTP_PER_HOST_LIMIT', 8)),
+        'connect_timeout': float(os.environ.get('HTTP_CONNECT_TIMEOUT', 5.0)),
+        'timeout': float(os.environ.get('HTTP_TIMEOUT', 30.0)),
+        'retries': int(os.environ.get('HTTP_CONNECT_RETRIES', 1)),
+        'http2': os.environ.get('HTTP2', '1') != '0' and importlib.util.find_spec('h2') is not None,
+    }
+
+
+class _ReleasingStream(httpx.SyncByteStream):
+    """Response body wrapper that frees a per-host slot once the body is closed"""
+
+    def __init__(self, stream, release):
+        self._stream = stream
+        self._release = release
+        self._released = False
+
+    def __iter__(self):
+        yield from self._stream
+
+    def close(self):
+        try:
+            self._stream.close()
+        finally:
+            if not self._released:
+                self._released = True
+                self._release()
+
+
+class HostLimitedTransport(httpx.BaseTransport):
+    """
+    Caps in-flight requests per host on top of a pooled transport
+
+    A slot is held until the response body is closed, so streamed TTS
+    responses count against the limit for as long as they are being read.
+    Waiting for a slot is bounded by the request's pool timeout (or
+    `pool_timeout`) and raises httpx.PoolTimeout like the pool itself.
+    """
+
+    def __init__(self, transport, per_host_limit, pool_timeout=None):
+        self._transport = transport
+        self._per_host_limit = per_host_limit
+        self._pool_timeout = pool_timeout
+        self._semaphores = {}
+        self._lock = threading.Lock()
+
+    def _semaphore(self, host):
+        with self._lock:
+            semaphore = self._semaphores.get(host)
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(self._per_host_limit)
+                self._semaphores[host] = semaphore
+            return semaphore
+
+    def handle_request(self, request):
+        semaphore = self._semaphore(request.url.host)
+        timeout = request.extensions.get('timeout', {}).get('pool', self._pool_timeout)
+        queued_at = time.perf_counter()
+        acquired = semaphore.acquire(timeout=timeout)
+        _queue_wait.total = queued_seconds() + time.perf_counter() - queued_at
+        if not acquired:
+            raise httpx.PoolTimeout(
+                f"No free slot for {request.url.host} within {timeout}s "
+                f"({self._per_host_limit} requests in flight)",
+                request=request
+            )
+        try:
+            response = self._transport.handle_request(request)
+        except Exception:
+            semaphore.release()
+            raise
+        response.stream = _ReleasingStream(response.stream, semaphore.release)
+        return response
+
+    def close(self):
+        self._transport.close()
+
+
+_shared_transport = None
+_shared_lock = threading.Lock()
+
+
+def shared_transport(settings=None):
+    """
+    Process-wide pooled transport; every client built here reuses its connections
+
+    Args:
+        settings: Override for transport_settings() (first call only)
+    """
+    global _shared_transport
+    with _shared_lock:
+        if _shared_transport is None:
+            settings = settings or transport_settings()
+            pooled = httpx.HTTPTransport(
+                http2=settings['http2'],
+                retries=settings['retries'],
+                limits=httpx.Limits(
+                    max_connections=settings['max_connections'],
+                    max_keepalive_connections=settings['max_keepalive'],
+                    keepalive_expiry=settings['keepalive_expiry']
+                )
+            )
+            _shared_transport = HostLimitedTransport(pooled, settings['per_host_limit'],
+                                                     pool_timeout=settings['timeout'])
+            logger.info(f"HTTP transport: {settings}")
+        return _shared_transport
+
+
+def http_timeout(settings=None):
+    settings = settings or transport_settings()
+    return httpx.Timeout(settings['timeout'], connect=settings['connect_timeout'])
+
+
+def build_http_client(settings=None):
+    """httpx.Client on the shared transport (for ElevenLabs and ad-hoc calls)"""
+    return httpx.Client(transport=shared_transport(settings), timeout=http_timeout(settings))
+
+
+def genai_http_options(settings=None):
+    """types.HttpOptions that route google-genai through the shared transport"""
+    from google.genai import types
+
+    settings = settings or transport_settings()
+    return types.HttpOptions(
+        timeout=int(settings['timeout'] * 1000),  # milliseconds
+        client_args={'transport': shared_transport(settings)}
+    )
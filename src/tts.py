@@ -0,0 +1,310 @@
+import io
+import logging
+import os
+import queue
+import re
+import tempfile
+import threading
+import wave
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class TTSBackend:
+    """
+    Common interface for speech backends
+
+    stream(text) yields encoded audio chunks as they are produced;
+    synthesize(text) returns the whole clip. mime_type describes the bytes.
+    """
+
+    name = "base"
+    mime_type = "audio/mpeg"
+
+    def stream(self, text):
+        raise NotImplementedError
+
+    def synthesize(self, text):
+        audio = bytearray()
+        for chunk in self.stream(text):
+            audio += chunk
+        return bytes(audio)
+
+
+class ElevenLabsBackend(TTSBackend):
+    name = "elevenlabs"
+    mime_type = "audio/mpeg"
+
+    def __init__(self, client, voice_id="Myn1LuZgd2qPMOg9BNtC", model_id="eleven_multilingual_v2"):
+        self.client = client
+        self.voice_id = voice_id
+        self.model_id = model_id
+
+    def stream(self, text):
+        audio_stream = self.client.text_to_speech.stream(
+            text=text,
+            voice_id=self.voice_id,
+            model_id=self.model_id
+        )
+        try:
+            for chunk in audio_stream:
+                if isinstance(chunk, bytes):
+                    yield chunk
+        finally:
+            # Closing the SDK generator ends the HTTP response and frees its connection
+            close = getattr(audio_stream, "close", None)
+            if close is not None:
+                close()
+
+
+def _words(text):
+    """Tokens used to look up prerendered clips ("1.5" -> "1", "point", "5")"""
+    tokens = []
+    for token in re.findall(r"[a-z]+|\d+(?:\.\d+)?", text.lower()):
+        if "." in token:
+            whole, frac = token.split(".")
+            tokens.extend([whole, "point"] + list(frac))
+        else:
+            tokens.append(token)
+    return tokens
+
+
+class ClipBackend(TTSBackend):
+    """
+    Offline speech from prerendered word clips
+
+    Loads every <word>.wav in a directory into memory once and answers by
+    concatenating the clips for the words in the text. Words without a clip
+    are skipped. All clips must share one sample format.
+    """
+
+    name = "clips"
+    mime_type = "audio/wav"
+
+    def __init__(self, clips_dir):
+        self.clips = {}
+        self.params = None
+        for filename in sorted(os.listdir(clips_dir)):
+            word, ext = os.path.splitext(filename)
+            if ext.lower() != ".wav":
+                continue
+            with wave.open(os.path.join(clips_dir, filename), "rb") as clip:
+                params = clip.getparams()[:3]  # channels, sample width, rate
+                if self.params is None:
+                    self.params = params
+                elif params != self.params:
+                    logger.warning(f"Skipping clip {filename}: format {params} != {self.params}")
+                    continue
+                self.clips[word.lower()] = clip.readframes(clip.getnframes())
+        if not self.clips:
+            raise ValueError(f"No .wav clips found in {clips_dir}")
+
+    def synthesize(self, text):
+        frames = [self.clips[w] for w in _words(text) if w in self.clips]
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as out:
+            out.setnchannels(self.params[0])
+            out.setsampwidth(self.params[1])
+            out.setframerate(self.params[2])
+            out.writeframes(b"".join(frames))
+        return buffer.getvalue()
+
+    def stream(self, text):
+        yield self.synthesize(text)
+
+
+class Pyttsx3Backend(TTSBackend):
+    """Offline CPU synthesizer via pyttsx3 (espeak / SAPI / NSSpeech)"""
+
+    name = "pyttsx3"
+    mime_type = "audio/wav"
+
+    def __init__(self, rate=None):
+        import pyttsx3
+
+        self.engine = pyttsx3.init()
+        if rate:
+            self.engine.setProperty("rate", rate)
+        # The engine is not thread-safe
+        self._lock = threading.Lock()
+
+    def synthesize(self, text):
+        fd, path = tempfile.mkstemp(suffix=".wav")
+        os.close(fd)
+        try:
+            with self._lock:
+                self.engine.save_to_file(text, path)
+                self.engine.runAndWait()
+            with open(path, "rb") as f:
+                return f.read()
+        finally:
+            os.remove(path)
+
+    def stream(self, text):
+        yield self.synthesize(text)
+
+
+def make_local_backend(clips_dir=None):
+    """
+    Best available offline backend: prerendered clips, then pyttsx3
+
+    Returns:
+        A TTSBackend, or None if neither is available
+    """
+    if clips_dir and os.path.isdir(clips_dir):
+        try:
+            return ClipBackend(clips_dir)
+        except Exception as e:
+            logger.warning(f"Clip TTS unavailable: {e}")
+    try:
+        return Pyttsx3Backend()
+    except Exception as e:
+        logger.warning(f"pyttsx3 TTS unavailable: {e}")
+    return None
+
+
+_END = object()
+
+
+class BudgetedTTS:
+    """
+    Routes speech to a cloud backend, falling back to a local one on a deadline
+
+    synthesize() gives the primary `budget` seconds for the whole clip;
+    stream() gives it `budget` seconds to produce its first chunk. Misses and
+    errors go to the fallback, so audio latency stays bounded. Callers that
+    are over their cloud quota pass use_primary=False to go straight to the
+    fallback; on_primary_error sees every primary failure (e.g. to spot 429s).
+    A primary request that misses its budget is cancelled at its next chunk
+    and its stream closed, so abandoned requests don't hold workers or
+    connections.
+    """
+
+    def __init__(self, primary, fallback=None, budget=1.5, max_workers=8, on_primary_error=None):
+        self.primary = primary
+        self.fallback = fallback
+        self.budget = budget
+        self.on_primary_error = on_primary_error
+        self.primary_calls = 0
+        self.fallbacks = 0
+        self.local_only = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tts")
+
+    def _primary_failed(self, error):
+        if self.on_primary_error is not None:
+            self.on_primary_error(error)
+
+    def _primary_chunks(self, text, cancelled):
+        """Primary audio chunks until done or `cancelled` is set; always closes the stream"""
+        audio_stream = self.primary.stream(text)
+        try:
+            for chunk in audio_stream:
+                if cancelled.is_set():
+                    logger.debug(f"TTS {self.primary.name} request cancelled")
+                    return
+                yield chunk
+        finally:
+            audio_stream.close()
+
+    def _collect(self, text, cancelled):
+        audio = bytearray()
+        for chunk in self._primary_chunks(text, cancelled):
+            audio += chunk
+        return bytes(audio)
+
+    def _use_fallback(self, reason):
+        self.fallbacks += 1
+        logger.warning(f"TTS {self.primary.name} {reason}; using {self.fallback.name}")
+        return self.fallback
+
+    def synthesize(self, text, use_primary=True):
+        """
+        Returns:
+            (audio bytes, mime type)
+        """
+        if not use_primary and self.fallback is not None:
+            self.local_only += 1
+            return self.fallback.synthesize(text), self.fallback.mime_type
+
+        self.primary_calls += 1
+        if self.fallback is None:
+            try:
+                return self.primary.synthesize(text), self.primary.mime_type
+            except Exception as e:
+                self._primary_failed(e)
+                raise
+
+        cancelled = threading.Event()
+        future = self._executor.submit(self._collect, text, cancelled)
+        try:
+            return future.result(timeout=self.budget), self.primary.mime_type
+        except Exception as e:
+            if future.done():
+                self._primary_failed(e)
+            else:
+                cancelled.set()
+            reason = f"missed its {self.budget}s budget" if not future.done() else f"failed: {e}"
+            backend = self._use_fallback(reason)
+            return backend.synthesize(text), backend.mime_type
+
+    def stream(self, text, use_primary=True):
+        """
+        Returns:
+            (iterator of audio chunks, mime type)
+        """
+        if not use_primary and self.fallback is not None:
+            self.local_only += 1
+            return self.fallback.stream(text), self.fallback.mime_type
+
+        self.primary_calls += 1
+        if self.fallback is None:
+            return self.primary.stream(text), self.primary.mime_type
+
+        chunks = queue.Queue()
+        cancelled = threading.Event()
+
+        def produce():
+            try:
+                for chunk in self._primary_chunks(text, cancelled):
+                    chunks.put(chunk)
+                chunks.put(_END)
+            except Exception as e:
+                chunks.put(e)
+
+        self._executor.submit(produce)
+        try:
+            first = chunks.get(timeout=self.budget)
+        except queue.Empty:
+            cancelled.set()
+            backend = self._use_fallback(f"missed its {self.budget}s first-chunk budget")
+            return backend.stream(text), backend.mime_type
+
+        if isinstance(first, Exception):
+            self._primary_failed(first)
+            backend = self._use_fallback(f"failed: {first}")
+            return backend.stream(text), backend.mime_type
+
+        def relay():
+            item = first
+            try:
+                while item is not _END:
+                    if isinstance(item, Exception):
+                        raise item
+                    yield item
+                    item = chunks.get()
+            finally:
+                # The consumer stopped early (client gone, send failed)
+                cancelled.set()
+
+        return relay(), self.primary.mime_type
+
+    def stats(self):
+        return {
+            'primary': self.primary.name,
+            'fallback': self.fallback.name if self.fallback else None,
+            'budget_s': self.budget,
+            'calls': self.primary_calls,
+            'fallbacks': self.fallbacks,
+            'local_only': self.local_only,
+        }